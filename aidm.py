@@ -1,11 +1,131 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import numpy as np
 import networkx as nx
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import time
 import datetime
+import queue
+import threading
+from itertools import islice
+from deadlock_cache import AnalysisCache
+from deadlock_core import (DEFAULT_CYCLE_LIMIT, AnalysisCancelled, Scenario, build_rag, check_cancelled, explain_deadlock, is_single_instance,
+                           iter_scenario_cycles, load_scenario)
+from deadlock_layout import LayoutCache, summarize_graph
+from deadlock_metrics import RunMetrics
+from deadlock_recovery import explore_recoveries
+from deadlock_replay import Replay
+from deadlock_snapshot import parse_text, validate_matrices
+
+class MatrixGrid:
+    # Virtualized process table: a fixed pool of Entry rows is re-bound to whichever
+    # processes are scrolled into view, so 100,000 processes cost the same widgets as 10.
+    # The values live in NumPy matrices; a cell that does not parse yet is kept as text.
+    COLUMNS = ("Max", "Allocated", "Request")
+
+    def __init__(self, parent, visible_rows=12):
+        self.frame = tk.Frame(parent, bg="#1a1a1a")
+        self.processes = []
+        self.matrices = [np.zeros((0, 0), dtype=np.int32) for _ in self.COLUMNS]
+        self.pending = {}  # (row, column) -> text that is not m integers
+        self.first = 0
+        self.shown = []    # (row, column, text) currently in each entry
+
+        table = tk.Frame(self.frame, bg="#1a1a1a")
+        table.pack(side="left")
+        tk.Label(table, text="Process", font=("Arial", 12, "bold"), bg="#1a1a1a", fg="white").grid(row=0, column=0, padx=5)
+        for c, name in enumerate(self.COLUMNS):
+            tk.Label(table, text=name, font=("Arial", 12, "bold"), bg="#1a1a1a", fg="white").grid(row=0, column=c + 1, padx=5)
+        self.rows = []
+        for k in range(visible_rows):
+            label = tk.Label(table, text="", font=("Arial", 12), bg="#1a1a1a", fg="white", width=8, anchor="w")
+            label.grid(row=k + 1, column=0, padx=5, pady=2)
+            entries = []
+            for c in range(len(self.COLUMNS)):
+                entry = tk.Entry(table, font=("Arial", 12), width=20)
+                entry.grid(row=k + 1, column=c + 1, padx=5, pady=2)
+                entry.bind("<FocusOut>", lambda e: self.commit())
+                entries.append(entry)
+            self.rows.append((label, entries))
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="left", fill="y")
+        for widget in [table] + [e for _, entries in self.rows for e in entries]:
+            widget.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 if e.delta > 0 else 1, "units"))
+            widget.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+            widget.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+
+    def load(self, processes, max_demand, allocated, requested):
+        self.processes = list(processes)
+        self.matrices = [np.array(a, dtype=np.int32) for a in (max_demand, allocated, requested)]
+        self.pending = {}
+        self.first = 0
+        self.show(0, commit=False)
+
+    def resize(self, n, m):
+        # Keeps the values that still fit, zero-fills the rest
+        self.commit()
+        matrices = []
+        for old in self.matrices:
+            new = np.zeros((n, m), dtype=np.int32)
+            rows, cols = min(n, old.shape[0]), min(m, old.shape[1])
+            new[:rows, :cols] = old[:rows, :cols]
+            matrices.append(new)
+        self.matrices = matrices
+        self.processes = self.processes[:n] + [f"P{i}" for i in range(len(self.processes), n)]
+        self.pending = {key: text for key, text in self.pending.items() if key[0] < n}
+        self.show(self.first, commit=False)
+
+    def cell_text(self, row, column):
+        if (row, column) in self.pending:
+            return self.pending[row, column]
+        return " ".join(map(str, self.matrices[column][row].tolist()))
+
+    def commit(self):
+        # Parse whatever was edited in the visible entries back into the matrices
+        m = self.matrices[0].shape[1]
+        for (row, column, text), entry in zip(self.shown, (e for _, entries in self.rows for e in entries)):
+            if row is None or entry.get() == text:
+                continue
+            values = entry.get().split()
+            try:
+                if len(values) != m:
+                    raise ValueError
+                self.matrices[column][row] = [int(x) for x in values]
+                self.pending.pop((row, column), None)
+            except ValueError:
+                self.pending[row, column] = entry.get()
+
+    def show(self, first, commit=True):
+        if commit:
+            self.commit()
+        n = len(self.processes)
+        self.first = max(0, min(first, n - len(self.rows)))
+        self.shown = []
+        for k, (label, entries) in enumerate(self.rows):
+            row = self.first + k
+            label.config(text=self.processes[row] if row < n else "")
+            for column, entry in enumerate(entries):
+                text = self.cell_text(row, column) if row < n else ""
+                entry.config(state="normal")
+                entry.delete(0, "end")
+                entry.insert(0, text)
+                if row >= n:
+                    entry.config(state="disabled")
+                self.shown.append((row if row < n else None, column, text))
+        if n:
+            self.scrollbar.set(self.first / n, min(1.0, (self.first + len(self.rows)) / n))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def yview(self, action, amount, unit=None):
+        n = len(self.processes)
+        if action == "moveto":
+            self.show(int(float(amount) * n))
+        else:
+            step = len(self.rows) if unit == "pages" else 1
+            self.show(self.first + int(amount) * step)
+
 
 class DeadlockVisualizer:
     def __init__(self, root):
@@ -15,11 +135,18 @@ class DeadlockVisualizer:
         self.theme = "dark"
         self.processes = []
         self.resources = ["Printer", "Disk", "Tape"]
-        self.available = {"Printer": 2, "Disk": 1, "Tape": 1}
-        self.max_demand = {}
-        self.allocated = {}
-        self.requested = {}
+        self.scenario = None
         self.rag = nx.DiGraph()
+        self.layouts = LayoutCache()
+        self.analysis_cache = AnalysisCache()  # re-running the same scenario skips detection and Banker's
+        self.lod_threshold = 300
+        self.histogram_bars = 50  # more processes than this get a distribution plot instead of one bar each
+        self.compress_wait_for = False  # detect and plan recovery on the process-only wait-for graph
+        self.trace_memory = False  # record each stage's Python heap peak with tracemalloc (slower)
+        self.lod_hops = 1
+        self.summary = None  # (rag, hops, summarized graph) of the last large graph drawn
+        self.metrics = None
+        self.metrics_callbacks = []  # called with each stage record as run_simulation finishes it
 
         self.setup_styles()
         self.create_home_page()
@@ -48,6 +175,7 @@ class DeadlockVisualizer:
         ttk.Button(button_panel, text="Run Example Scenario", command=self.run_example_simulation).grid(row=1, column=1, padx=20, pady=10, sticky="ew")
         ttk.Button(button_panel, text="Learn About Deadlocks", command=self.show_interactive_info).grid(row=2, column=0, padx=20, pady=10, sticky="ew")
         ttk.Button(button_panel, text="Switch Theme", command=self.toggle_theme).grid(row=2, column=1, padx=20, pady=10, sticky="ew")
+        ttk.Button(button_panel, text="Replay Event Log", command=self.replay_event_log).grid(row=3, column=0, columnspan=2, padx=20, pady=10, sticky="ew")
 
         tk.Label(self.home_frame, text="Designed for Deadlock Detection & Prevention", font=("Arial", 12), bg="#1a1a1a", fg="#cccccc").pack(side="bottom", pady=10)
 
@@ -74,35 +202,39 @@ class DeadlockVisualizer:
         self.num_processes = tk.Entry(scrollable_frame, font=("Arial", 12))
         self.num_processes.pack(anchor="w", pady=5, padx=10)
 
-        tk.Label(scrollable_frame, text="Available Resources (Printer Disk Tape):", font=("Arial", 14), bg="#1a1a1a", fg="white").pack(anchor="w", pady=5, padx=10)
+        tk.Label(scrollable_frame, text="Resource Types (space-separated names):", font=("Arial", 14), bg="#1a1a1a", fg="white").pack(anchor="w", pady=5, padx=10)
+        self.resource_names_entry = tk.Entry(scrollable_frame, font=("Arial", 12), width=60)
+        self.resource_names_entry.insert(0, " ".join(self.resources))
+        self.resource_names_entry.pack(anchor="w", pady=5, padx=10)
+
+        tk.Label(scrollable_frame, text="Available Resources (one value per resource type):", font=("Arial", 14), bg="#1a1a1a", fg="white").pack(anchor="w", pady=5, padx=10)
         self.available_entry = tk.Entry(scrollable_frame, font=("Arial", 12))
         self.available_entry.pack(anchor="w", pady=5, padx=10)
 
-        self.process_entries = []
-        def update_process_entries(*args):
-            try:
-                n = int(self.num_processes.get() or 0)
-                for entry_tuple in self.process_entries:
-                    for widget in entry_tuple:
-                        widget.master.destroy()
-                self.process_entries.clear()
-                for i in range(n):
-                    frame = tk.Frame(scrollable_frame, bg="#1a1a1a")
-                    frame.pack(anchor="w", pady=5, padx=10)
-                    tk.Label(frame, text=f"P{i} Max (Printer Disk Tape):", font=("Arial", 12), bg="#1a1a1a", fg="white").pack(side="left", pady=2)
-                    max_entry = tk.Entry(frame, font=("Arial", 12), width=15)
-                    max_entry.pack(side="left", pady=2, padx=5)
-                    tk.Label(frame, text=f"P{i} Allocated:", font=("Arial", 12), bg="#1a1a1a", fg="white").pack(side="left", pady=2, padx=5)
-                    alloc_entry = tk.Entry(frame, font=("Arial", 12), width=15)
-                    alloc_entry.pack(side="left", pady=2, padx=5)
-                    tk.Label(frame, text=f"P{i} Request:", font=("Arial", 12), bg="#1a1a1a", fg="white").pack(side="left", pady=2, padx=5)
-                    req_entry = tk.Entry(frame, font=("Arial", 12), width=15)
-                    req_entry.pack(side="left", pady=2, padx=5)
-                    self.process_entries.append((max_entry, alloc_entry, req_entry))
-            except ValueError:
-                pass
+        # Paste or open the whole table at once (see deadlock_snapshot.parse_text), or type
+        # into the grid, which only has widgets for the rows in view
+        import_buttons = tk.Frame(scrollable_frame, bg="#1a1a1a")
+        import_buttons.pack(anchor="w", pady=5, padx=10)
+        ttk.Button(import_buttons, text="Import Matrix File...", command=self.import_matrix_file).pack(side="left", padx=5)
+        ttk.Button(import_buttons, text="Paste Matrices", command=self.paste_matrices).pack(side="left", padx=5)
 
-        self.num_processes.bind("<KeyRelease>", update_process_entries)
+        self.process_grid = MatrixGrid(scrollable_frame)
+        self.process_grid.frame.pack(anchor="w", pady=5, padx=10)
+
+        def resize_grid(*args):
+            n = self.num_processes.get().strip()
+            if n.isdigit():
+                self.process_grid.resize(int(n), len(self.resource_names_entry.get().split()))
+
+        self.num_processes.bind("<KeyRelease>", resize_grid)
+        self.resource_names_entry.bind("<KeyRelease>", resize_grid)
+        self.process_grid.resize(0, len(self.resources))
+        self.compress_var = tk.BooleanVar(value=self.compress_wait_for)
+        tk.Checkbutton(scrollable_frame, text="Analyze single-instance resources on the compressed wait-for graph", variable=self.compress_var,
+                       font=("Arial", 12), bg="#1a1a1a", fg="white", selectcolor="#333333").pack(anchor="w", pady=5, padx=10)
+        self.trace_memory_var = tk.BooleanVar(value=self.trace_memory)
+        tk.Checkbutton(scrollable_frame, text="Trace memory of each analysis stage (slower)", variable=self.trace_memory_var,
+                       font=("Arial", 12), bg="#1a1a1a", fg="white", selectcolor="#333333").pack(anchor="w", pady=5, padx=10)
         ttk.Button(scrollable_frame, text="Start Simulation", command=self.run_manual_simulation).pack(anchor="w", pady=15, padx=10)
         ttk.Button(scrollable_frame, text="Back to Home", command=self.back_to_home).pack(anchor="w", pady=10, padx=10)
 
@@ -169,61 +301,66 @@ class DeadlockVisualizer:
         self.apply_theme()
 
     def show_prevention_options(self, deadlock_cycles, scrollable_frame):
-        cycle = deadlock_cycles[0]
-        involved_processes = [n for n in cycle if n.startswith("P")]
-        involved_resources = [n for n in cycle if n in self.resources]
-
-        if len(involved_resources) <= 2 and len(involved_resources) > 0:
-            resource = involved_resources[0]
-            holder = next((p for r, p in self.rag.edges if r == resource), None)
-            requester = next((p for p, r in self.rag.edges if r == resource), None)
-            if holder and requester and holder != requester:
-                best_method = "Resource Preemption"
-                suggestion = f"Preempt {resource} from {holder} and allocate it to {requester}."
-                explanation = f"By preempting {resource} from {holder}, {requester} can complete its task and release all resources, breaking the cycle."
-                new_rag = self.rag.copy()
-                new_rag.remove_edge(resource, holder)
-                new_rag.add_edge(resource, requester, type="assignment")
-            else:
-                best_method = "Process Termination"
-                suggestion = f"Terminate {involved_processes[0]} to release its resources ({', '.join([r for r, p in self.rag.edges if p == involved_processes[0]])})."
-                explanation = f"Terminating {involved_processes[0]} releases its resources, allowing other processes to proceed and breaking the deadlock."
-                new_rag = self.rag.copy()
-                new_rag.remove_node(involved_processes[0])
-        elif len(involved_processes) > 2:
-            best_method = "Process Termination"
-            suggestion = f"Terminate {involved_processes[0]} to release its resources ({', '.join([r for r, p in self.rag.edges if p == involved_processes[0]])})."
-            explanation = f"Terminating {involved_processes[0]} releases its resources, allowing other processes to proceed and breaking the deadlock."
-            new_rag = self.rag.copy()
-            new_rag.remove_node(involved_processes[0])
-        else:
-            best_method = "Avoidance (Banker’s Algorithm)"
-            suggestion = "Deny further requests until a safe sequence is possible."
-            explanation = "Using Banker’s Algorithm, the system would have denied the last request that led to this unsafe state, preventing the deadlock."
-            new_rag = self.rag.copy()
-
         apply_frame = tk.Frame(scrollable_frame, bg="#1a1a1a", relief="groove", borderwidth=2)
         apply_frame.pack(pady=10)
-        tk.Label(apply_frame, text=f"Applied Prevention Technique: {best_method}", font=("Arial", 16, "italic"), bg="#1a1a1a", fg="#4a90e2").pack(pady=5)
-        tk.Label(apply_frame, text=f"Action: {suggestion}", font=("Arial", 14), bg="#1a1a1a", fg="white", wraplength=800, justify="left").pack(pady=5)
-        tk.Label(apply_frame, text=f"Explanation: {explanation}", font=("Arial", 14), bg="#1a1a1a", fg="white", wraplength=800, justify="left").pack(pady=5)
+        resolved_frame = tk.Frame(scrollable_frame, bg="#1a1a1a")
+        resolved_frame.pack()
+
+        def show(plan):
+            best_method, suggestion, explanation, new_rag = plan
+            tk.Label(apply_frame, text=f"Applied Prevention Technique: {best_method}", font=("Arial", 16, "italic"), bg="#1a1a1a", fg="#4a90e2").pack(pady=5)
+            tk.Label(apply_frame, text=f"Action: {suggestion}", font=("Arial", 14), bg="#1a1a1a", fg="white", wraplength=800, justify="left").pack(pady=5)
+            tk.Label(apply_frame, text=f"Explanation: {explanation}", font=("Arial", 14), bg="#1a1a1a", fg="white", wraplength=800, justify="left").pack(pady=5)
+            self.show_recovery_alternatives(apply_frame)
+
+            tk.Label(resolved_frame, text="Resolved State:", font=("Arial", 16, "italic"), bg="#1a1a1a", fg="#4a90e2").pack(pady=5)
+            plt.clf()
+            # Anchor to the positions on screen: above lod_threshold that is the summary
+            self.draw_rag(new_rag, base=self.layouts.layout(self.display_graph(self.rag)))
+
+            resolved_canvas_frame = tk.Frame(resolved_frame, bg="#1a1a1a")
+            resolved_canvas_frame.pack(pady=10)
+            resolved_rag_canvas = FigureCanvasTkAgg(plt.gcf(), master=resolved_canvas_frame)
+            resolved_rag_canvas.draw()
+            resolved_rag_canvas.get_tk_widget().pack()
+
+            self.rag = new_rag
+
+        self.plan_recovery_in_background(deadlock_cycles, apply_frame, show)
+
+    def plan_recovery_in_background(self, deadlock_cycles, parent, on_done):
+        # The victim search can take a while on large deadlocks, so like
+        # show_recovery_alternatives it runs on a worker thread; on_done gets
+        # plan_recovery's result back on the Tk thread
+        label = tk.Label(parent, text="Planning recovery...", font=("Arial", 12), bg="#1a1a1a", fg="#cccccc")
+        label.pack(pady=5)
+        events = queue.Queue()
+        rag, scenario, wait_for = self.rag, self.scenario, self.wait_for_graph()
+
+        def work():
+            try:
+                events.put(("done", self.analysis_cache.plan_recovery(rag, deadlock_cycles, scenario.resource_index,
+                                                                      wait_for=wait_for, scenario=scenario)))
+            except Exception as e:
+                events.put(("error", e))
 
-        tk.Label(scrollable_frame, text="Resolved State:", font=("Arial", 16, "italic"), bg="#1a1a1a", fg="#4a90e2").pack(pady=5)
-        plt.clf()
-        pos = nx.spring_layout(new_rag)
-        nx.draw_networkx_nodes(new_rag, pos, nodelist=[p for p in new_rag.nodes if p.startswith("P")], node_color="#ff9999", node_shape="s", node_size=500)
-        nx.draw_networkx_nodes(new_rag, pos, nodelist=self.resources, node_color="#9999ff", node_shape="o", node_size=500)
-        nx.draw_networkx_edges(new_rag, pos, edgelist=[(u, v) for u, v in new_rag.edges if u in self.resources], edge_color="black", style="solid", width=2)
-        nx.draw_networkx_edges(new_rag, pos, edgelist=[(u, v) for u, v in new_rag.edges if v in self.resources], edge_color="gray", style="dashed", width=2)
-        nx.draw_networkx_labels(new_rag, pos, font_size=10)
-        
-        resolved_canvas_frame = tk.Frame(scrollable_frame, bg="#1a1a1a")
-        resolved_canvas_frame.pack(pady=10)
-        resolved_rag_canvas = FigureCanvasTkAgg(plt.gcf(), master=resolved_canvas_frame)
-        resolved_rag_canvas.draw()
-        resolved_rag_canvas.get_tk_widget().pack()
+        threading.Thread(target=work, daemon=True).start()
 
-        self.rag = new_rag
+        def poll():
+            try:
+                kind, plan = events.get_nowait()
+            except queue.Empty:
+                self.root.after(50, poll)
+                return
+            if not label.winfo_exists():
+                return  # the view was closed meanwhile
+            label.destroy()
+            if kind == "error":
+                tk.Label(parent, text=f"Could not plan a recovery: {plan}", font=("Arial", 12), bg="#1a1a1a", fg="#ff4d4d").pack(pady=5)
+                return
+            on_done(plan)
+
+        self.root.after(50, poll)
 
     def back_to_home(self):
         if hasattr(self, 'input_frame') and self.input_frame.winfo_exists():
@@ -263,62 +400,124 @@ class DeadlockVisualizer:
         self.theme = "light" if self.theme == "dark" else "dark"
         self.apply_theme()
 
+    def display_graph(self, rag):
+        if len(rag) <= self.lod_threshold:
+            return rag
+        # Level of detail: deadlocked components and their neighborhood, the rest grouped
+        if self.summary is None or self.summary[0] is not rag or self.summary[1] != self.lod_hops:
+            resources = self.scenario.resource_index if self.scenario else set(self.resources)
+            self.summary = (rag, self.lod_hops, summarize_graph(rag, resources, self.lod_hops))
+        return self.summary[2]
+
+    def draw_rag(self, rag, base=None):
+        resources = self.scenario.resource_index if self.scenario else set(self.resources)
+        rag = self.display_graph(rag)
+        # One pass over nodes and edges, split by node kind
+        kinds = {n: d.get("kind") or ("resource" if n in resources else "process") for n, d in rag.nodes(data=True)}
+        nodes = {"process": [], "resource": [], "group": []}
+        for n, kind in kinds.items():
+            nodes[kind].append(n)
+        assignments, requests, group_edges = [], [], []
+        for u, v in rag.edges:
+            if kinds[u] == "group" or kinds[v] == "group":
+                group_edges.append((u, v))
+            elif kinds[u] == "resource":
+                assignments.append((u, v))
+            else:
+                requests.append((u, v))
+        groups = {n: rag.nodes[n] for n in nodes["group"]}
+
+        pos = self.layouts.layout(rag, base)
+        nx.draw_networkx_nodes(rag, pos, nodelist=nodes["process"], node_color="#ff9999", node_shape="s", node_size=500)
+        nx.draw_networkx_nodes(rag, pos, nodelist=nodes["resource"], node_color="#9999ff", node_shape="o", node_size=500)
+        if groups:
+            nx.draw_networkx_nodes(rag, pos, nodelist=list(groups), node_color=["#ff4d4d" if d["deadlocked"] else "#bbbbbb" for d in groups.values()],
+                                   node_shape="h", node_size=[300 + 200 * np.log10(d["size"]) for d in groups.values()])
+        nx.draw_networkx_edges(rag, pos, edgelist=assignments, edge_color="black", style="solid", width=2)
+        nx.draw_networkx_edges(rag, pos, edgelist=requests, edge_color="gray", style="dashed", width=2)
+        nx.draw_networkx_edges(rag, pos, edgelist=group_edges, edge_color="#bbbbbb", style="dotted", width=1)
+        nx.draw_networkx_labels(rag, pos, labels={n: f"{groups[n]['size']} nodes" if n in groups else n for n in rag.nodes}, font_size=10)
+
     def plot_rag(self, frame):
         plt.clf()
-        pos = nx.spring_layout(self.rag)
-        nx.draw_networkx_nodes(self.rag, pos, nodelist=[p for p in self.rag.nodes if p.startswith("P")], node_color="#ff9999", node_shape="s", node_size=500)
-        nx.draw_networkx_nodes(self.rag, pos, nodelist=self.resources, node_color="#9999ff", node_shape="o", node_size=500)
-        nx.draw_networkx_edges(self.rag, pos, edgelist=[(u, v) for u, v in self.rag.edges if u in self.resources], edge_color="black", style="solid", width=2)
-        nx.draw_networkx_edges(self.rag, pos, edgelist=[(u, v) for u, v in self.rag.edges if v in self.resources], edge_color="gray", style="dashed", width=2)
-        nx.draw_networkx_labels(self.rag, pos, font_size=10)
+        self.draw_rag(self.rag)
         canvas = FigureCanvasTkAgg(plt.gcf(), master=frame)
         canvas.draw()
         canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
 
-    def detect_deadlock(self):
-        try:
-            cycles = list(nx.simple_cycles(self.rag))
-            return cycles if cycles else None
-        except:
-            return None
+        if len(self.rag) > self.lod_threshold:
+            controls = tk.Frame(frame, bg="#1a1a1a")
+            controls.pack(pady=5)
+            tk.Label(controls, text=f"Showing deadlocked components of {len(self.rag)} nodes. Neighborhood hops:", font=("Arial", 12), bg="#1a1a1a", fg="white").pack(side="left")
+            hops = tk.Spinbox(controls, from_=0, to=5, width=3, font=("Arial", 12))
+            hops.delete(0, "end")
+            hops.insert(0, str(self.lod_hops))
+            hops.pack(side="left", padx=5)
+
+            def redraw():
+                self.lod_hops = int(hops.get())
+                for child in frame.winfo_children():
+                    child.destroy()
+                plt.figure()  # the current figure may be the histogram by now
+                self.plot_rag(frame)
+            hops.configure(command=redraw)
+
+    def detect_deadlock(self, all_cycles=False, cycle_limit=DEFAULT_CYCLE_LIMIT, cancel=None):
+        _, cycles = self.analysis_cache.detect(self.scenario, all_cycles, cycle_limit, cancel, compress=self.compress_wait_for)
+        return cycles if cycles else None
+
+    def wait_for_graph(self):
+        # The scenario's wait-for graph when compression is on and applies, else None
+        if self.compress_wait_for and is_single_instance(self.scenario):
+            return self.scenario.wait_for()
+        return None
 
     def generate_deadlock_explanation(self, cycle):
-        wait_explanations = []
-        n = len(cycle) - 1  # Last element is the repeated start process
-        for i in range(0, n-1, 2):
-            process = cycle[i]
-            resource = cycle[i+1]
-            holder = cycle[i+2] if i+2 < n else cycle[0]
-            wait_explanations.append(f"Process {process} is waiting for resource {resource}, which is held by Process {holder}.")
-        
-        explanation = "Reason for Deadlock: Circular Wait\n\n"
-        explanation += "The deadlock occurred due to a circular wait condition, where processes form a loop waiting for resources held by others:\n"
-        explanation += "\n".join(wait_explanations) + "\n\n"
-        explanation += "Additional Conditions Present:\n"
-        explanation += "- Mutual Exclusion: Resources (Printer, Disk, Tape) can only be held by one process at a time.\n"
-        explanation += "- Hold and Wait: Each process holds at least one resource while waiting for another.\n"
-        explanation += "- No Preemption: Resources cannot be forcibly taken; processes must release them voluntarily."
-        
-        return explanation
+        return explain_deadlock(cycle, self.scenario)
+
+    def import_matrix_file(self):
+        path = filedialog.askopenfilename(title="Import matrices", filetypes=[("Matrix files", "*.csv *.txt *.json *.dlsnap"), ("All files", "*")])
+        if not path:
+            return
+        try:
+            if path.endswith((".json", ".dlsnap")):
+                scenario = load_scenario(path)
+                errors = [message for _, message in validate_matrices(scenario.processes, scenario.resources, scenario.available,
+                                                                      scenario.max_demand, scenario.allocated, scenario.requested)]
+            else:
+                with open(path) as f:
+                    scenario, errors = parse_text(f)
+                errors = [f"line {line}: {message}" for line, message in errors]
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Import Error", f"Could not read {path}: {e}")
+            return
+        self.load_matrices(scenario, errors)
+
+    def paste_matrices(self):
+        try:
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            messagebox.showerror("Paste Error", "The clipboard is empty.")
+            return
+        scenario, errors = parse_text(text.splitlines())
+        self.load_matrices(scenario, [f"line {line}: {message}" for line, message in errors])
+
+    def load_matrices(self, scenario, errors):
+        if errors:
+            self.show_input_errors(errors)
+            return
+        for entry, text in ((self.num_processes, str(len(scenario.processes))), (self.resource_names_entry, " ".join(scenario.resources)),
+                            (self.available_entry, " ".join(map(str, scenario.available.tolist())))):
+            entry.delete(0, "end")
+            entry.insert(0, text)
+        self.process_grid.load(scenario.processes, scenario.max_demand, scenario.allocated, scenario.requested)
+
+    def show_input_errors(self, messages, limit=15):
+        more = len(messages) - limit
+        messagebox.showerror("Input Error", "\n".join(messages[:limit]) + (f"\n... and {more} more" if more > 0 else ""))
 
     def bankers_safe(self):
-        work = self.available.copy()
-        finish = {p: False for p in self.processes}
-        need = {p: {r: self.max_demand[p][r] - self.allocated[p][r] for r in self.resources} for p in self.processes}
-        safe_sequence = []
-        
-        while False in finish.values():
-            found = False
-            for p in self.processes:
-                if not finish[p] and all(need[p][r] <= work[r] for r in self.resources):
-                    for r in self.resources:
-                        work[r] += self.allocated[p][r]
-                    finish[p] = True
-                    safe_sequence.append(p)
-                    found = True
-            if not found:
-                return None
-        return safe_sequence
+        return self.analysis_cache.bankers_safe(self.scenario)
 
     def run_manual_simulation(self):
         try:
@@ -329,14 +528,24 @@ class DeadlockVisualizer:
                 return
 
             n = int(n)
-            if n != len(self.process_entries):
+            if n != len(self.process_grid.processes):
                 messagebox.showerror("Input Error", "Number of process entries does not match the specified number of processes.")
                 return
 
+            # Validate resource types
+            resources = self.resource_names_entry.get().split()
+            if not resources:
+                messagebox.showerror("Input Error", "Enter at least one resource type.")
+                return
+            if len(set(resources)) != len(resources):
+                messagebox.showerror("Input Error", "Resource type names must be unique.")
+                return
+            m = len(resources)
+
             # Validate available resources
             avail_input = self.available_entry.get().strip().split()
-            if len(avail_input) != 3:
-                messagebox.showerror("Input Error", "Available Resources must contain exactly 3 values (Printer, Disk, Tape).")
+            if len(avail_input) != m:
+                messagebox.showerror("Input Error", f"Available Resources must contain exactly {m} values ({', '.join(resources)}).")
                 return
             try:
                 avail = [int(x) for x in avail_input]
@@ -347,60 +556,29 @@ class DeadlockVisualizer:
                 messagebox.showerror("Input Error", "Available Resources must be integers.")
                 return
 
-            self.available = dict(zip(self.resources, avail))
-            self.processes = [f"P{i}" for i in range(n)]
-            self.max_demand = {}
-            self.allocated = {}
-            self.requested = {}
-            self.rag.clear()
-
-            # Validate process entries
-            for i, (max_entry, alloc_entry, req_entry) in enumerate(self.process_entries):
-                p = f"P{i}"
-                max_input = max_entry.get().strip().split()
-                alloc_input = alloc_entry.get().strip().split()
-                req_input = req_entry.get().strip().split()
-
-                # Check length
-                if len(max_input) != 3 or len(alloc_input) != 3 or len(req_input) != 3:
-                    messagebox.showerror("Input Error", f"Process {p} must have exactly 3 values for Max, Allocated, and Requested.")
-                    return
-
-                # Check integer and non-negative
-                try:
-                    max_vals = [int(x) for x in max_input]
-                    alloc_vals = [int(x) for x in alloc_input]
-                    req_vals = [int(x) for x in req_input]
-                    if any(x < 0 for x in max_vals + alloc_vals + req_vals):
-                        messagebox.showerror("Input Error", f"Process {p} values must be non-negative integers.")
-                        return
-                except ValueError:
-                    messagebox.showerror("Input Error", f"Process {p} values must be integers.")
-                    return
-
-                # Check allocated <= max
-                if any(alloc_vals[j] > max_vals[j] for j in range(3)):
-                    messagebox.showerror("Input Error", f"Process {p} Allocated resources cannot exceed Max Demand.")
-                    return
-
-                self.max_demand[p] = dict(zip(self.resources, max_vals))
-                self.allocated[p] = dict(zip(self.resources, alloc_vals))
-                self.requested[p] = dict(zip(self.resources, req_vals))
+            # Validate the process table: all rows at once
+            grid = self.process_grid
+            grid.commit()
+            if grid.matrices[0].shape[1] != m:
+                grid.resize(n, m)
+            if grid.pending:
+                row, column = min(grid.pending)
+                messagebox.showerror("Input Error", f"Process {grid.processes[row]} must have exactly {m} integer values for {MatrixGrid.COLUMNS[column]}.")
+                return
+            processes = grid.processes
+            max_rows, alloc_rows, req_rows = grid.matrices
+            errors = validate_matrices(processes, resources, np.array(avail), max_rows, alloc_rows, req_rows)
+            if errors:
+                self.show_input_errors([message for _, message in errors])
+                return
 
-            # Check total allocated vs available
-            total_allocated = {r: sum(self.allocated[p][r] for p in self.processes) for r in self.resources}
-            for r in self.resources:
-                if total_allocated[r] > self.available[r] + total_allocated[r]:  # Simplified check; assumes initial total resources = available + allocated
-                    messagebox.showerror("Input Error", f"Total allocated {r} exceeds available resources.")
-                    return
+            self.scenario = Scenario(processes, resources, avail, max_rows, alloc_rows, req_rows)
+            self.compress_wait_for = self.compress_var.get()
+            self.trace_memory = self.trace_memory_var.get()
+            self.processes, self.resources = self.scenario.processes, self.scenario.resources
 
             # Build RAG
-            for p in self.processes:
-                for r in self.resources:
-                    if self.allocated[p][r] > 0:
-                        self.rag.add_edge(r, p)
-                    if self.requested[p][r] > 0:
-                        self.rag.add_edge(p, r)
+            self.rag = build_rag(self.scenario)
 
             self.input_frame.pack_forget()
             self.run_simulation(is_manual=True)
@@ -409,30 +587,28 @@ class DeadlockVisualizer:
             messagebox.showerror("Unexpected Error", f"An unexpected error occurred: {str(e)}")
 
     def run_example_simulation(self):
-        self.processes = ["P0", "P1", "P2"]
-        self.available = {"Printer": 1, "Disk": 1, "Tape": 0}
-        self.max_demand = {
-            "P0": {"Printer": 2, "Disk": 1, "Tape": 1},
-            "P1": {"Printer": 1, "Disk": 2, "Tape": 1},
-            "P2": {"Printer": 1, "Disk": 1, "Tape": 2}
-        }
-        self.allocated = {
-            "P0": {"Printer": 1, "Disk": 0, "Tape": 1},
-            "P1": {"Printer": 0, "Disk": 1, "Tape": 0},
-            "P2": {"Printer": 0, "Disk": 0, "Tape": 1}
-        }
-        self.requested = {
-            "P0": {"Printer": 0, "Disk": 1, "Tape": 0},
-            "P1": {"Printer": 1, "Disk": 0, "Tape": 0},
-            "P2": {"Printer": 0, "Disk": 1, "Tape": 0}
-        }
-        self.rag.clear()
-        for p in self.processes:
-            for r in self.resources:
-                if self.allocated[p][r] > 0:
-                    self.rag.add_edge(r, p)
-                if self.requested[p][r] > 0:
-                    self.rag.add_edge(p, r)
+        self.scenario = Scenario.from_dict({
+            "processes": ["P0", "P1", "P2"],
+            "resources": ["Printer", "Disk", "Tape"],
+            "available": {"Printer": 1, "Disk": 1, "Tape": 0},
+            "max": {
+                "P0": {"Printer": 2, "Disk": 1, "Tape": 1},
+                "P1": {"Printer": 1, "Disk": 2, "Tape": 1},
+                "P2": {"Printer": 1, "Disk": 1, "Tape": 2}
+            },
+            "allocated": {
+                "P0": {"Printer": 1, "Disk": 0, "Tape": 1},
+                "P1": {"Printer": 0, "Disk": 1, "Tape": 0},
+                "P2": {"Printer": 0, "Disk": 0, "Tape": 1}
+            },
+            "requested": {
+                "P0": {"Printer": 0, "Disk": 1, "Tape": 0},
+                "P1": {"Printer": 1, "Disk": 0, "Tape": 0},
+                "P2": {"Printer": 0, "Disk": 1, "Tape": 0}
+            }
+        })
+        self.processes, self.resources = self.scenario.processes, self.scenario.resources
+        self.rag = build_rag(self.scenario)
 
         self.home_frame.pack_forget()
         self.run_simulation(is_manual=False)
@@ -454,55 +630,445 @@ class DeadlockVisualizer:
 
         tk.Label(scrollable_frame, text="Deadlock Analysis", font=("Arial", 20, "bold"), bg="#1a1a1a", fg="white").pack(pady=15)
 
+        self.metrics = RunMetrics(trace_memory=self.trace_memory)
+        self.metrics.count(processes=len(self.processes), resources=len(self.resources),
+                           nodes=self.rag.number_of_nodes(), edges=self.rag.number_of_edges())
+
+        # Layout, detection and Banker's run on a worker thread that reports through a
+        # queue; the Tk loop polls it, so the window stays responsive and can cancel
+        progress_frame = tk.Frame(scrollable_frame, bg="#1a1a1a")
+        progress_frame.pack(pady=20)
+        status_label = tk.Label(progress_frame, text="Starting analysis...", font=("Arial", 14), bg="#1a1a1a", fg="white")
+        status_label.pack(pady=5)
+        progress = ttk.Progressbar(progress_frame, length=400, maximum=4 if is_manual else 3)
+        progress.pack(pady=5)
+        cancel = threading.Event()
+
+        def cancel_analysis():
+            cancel.set()
+            status_label.config(text="Cancelling...")
+
+        ttk.Button(progress_frame, text="Cancel", command=cancel_analysis).pack(pady=10)
+
+        events = queue.Queue()
+        self.metrics.callbacks.append(lambda record: events.put(("stage", record)))
+        threading.Thread(target=self.analyze_in_background, args=(events, cancel, is_manual), daemon=True).start()
+
+        def poll():
+            while True:
+                try:
+                    kind, payload = events.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "status":
+                    status_label.config(text=payload)
+                elif kind == "stage":
+                    progress.step(1)
+                    self.report_stage(payload)
+                elif kind == "done":
+                    progress_frame.destroy()
+                    self.show_analysis(scrollable_frame, is_manual, payload)
+                    return
+                elif kind == "cancelled":
+                    self.back_to_home()
+                    return
+                else:
+                    messagebox.showerror("Analysis Error", f"Analysis failed: {payload}")
+                    self.back_to_home()
+                    return
+            self.root.after(50, poll)
+
+        self.root.after(50, poll)
+        self.apply_theme()
+
+    def analyze_in_background(self, events, cancel, is_manual):
+        # Worker thread: no Tk calls here, everything goes back through events
+        try:
+            result = {}
+            events.put(("status", "Laying out the graph..."))
+            with self.metrics.stage("layout"):
+                self.layouts.layout(self.display_graph(self.rag))
+            check_cancelled(cancel)
+
+            events.put(("status", "Detecting deadlocks..."))
+            with self.metrics.stage("detect_deadlock"):
+                deadlock = result["deadlock"] = self.detect_deadlock(cancel=cancel)
+            if deadlock and is_manual:
+                events.put(("status", "Explaining the deadlock..."))
+                with self.metrics.stage("explanation"):
+                    result["explanation"] = self.generate_deadlock_explanation(deadlock[0])
+            check_cancelled(cancel)
+
+            events.put(("status", "Checking Banker's safety..."))
+            with self.metrics.stage("bankers_safe"):
+                result["safe_seq"] = self.bankers_safe()
+            check_cancelled(cancel)
+            events.put(("done", result))
+        except AnalysisCancelled:
+            events.put(("cancelled", None))
+        except Exception as e:
+            events.put(("error", e))
+
+    def show_analysis(self, scrollable_frame, is_manual, result):
+        # Back on the Tk thread: draw from the worker's results (layout is cached by now)
+        self.metrics.callbacks = [self.report_stage]
+        deadlock = result["deadlock"]
+        self.metrics.count(cycles=len(deadlock) if deadlock else 0)
+
         rag_frame = tk.Frame(scrollable_frame, bg="#1a1a1a")
         rag_frame.pack(pady=10)
-        self.plot_rag(rag_frame)
+        with self.metrics.stage("plot_rag"):
+            self.plot_rag(rag_frame)
 
-        deadlock = self.detect_deadlock()
         status = "Deadlock Detected" if deadlock else "No Deadlock"
         tk.Label(scrollable_frame, text=f"Status: {status}", font=("Arial", 14), bg="#1a1a1a", fg="white").pack(pady=5)
         if deadlock:
-            tk.Label(scrollable_frame, text=f"Cycles: {deadlock}", font=("Arial", 12), bg="#1a1a1a", fg="white").pack(pady=5)
+            self.show_cycles(scrollable_frame, deadlock, result.get("explanation", ""))
             if is_manual:
-                explanation = self.generate_deadlock_explanation(deadlock[0])
-                tk.Label(scrollable_frame, text=explanation, font=("Arial", 12), bg="#1a1a1a", fg="white", wraplength=1000, justify="left").pack(pady=10)
                 ttk.Button(scrollable_frame, text="Apply Prevention", command=lambda: self.show_prevention_options(deadlock, scrollable_frame)).pack(pady=10)
             else:
                 ttk.Button(scrollable_frame, text="Prevention Options", command=lambda: self.show_prevention_options_window(deadlock)).pack(pady=10)
 
-        safe_seq = self.bankers_safe()
+        safe_seq = result["safe_seq"]
         safe_status = "Safe" if safe_seq else "Unsafe"
         tk.Label(scrollable_frame, text=f"Banker's Safety: {safe_status}", font=("Arial", 14), bg="#1a1a1a", fg="white").pack(pady=5)
         if safe_seq:
-            tk.Label(scrollable_frame, text=f"Safe Sequence: {safe_seq}", font=("Arial", 12), bg="#1a1a1a", fg="white").pack(pady=5)
+            # Only the head of a long sequence; the whole of it would be one enormous label
+            shown = ", ".join(map(str, safe_seq[:20]))
+            more = f" … ({len(safe_seq) - 20:,} more)" if len(safe_seq) > 20 else ""
+            tk.Label(scrollable_frame, text=f"Safe Sequence: {shown}{more}", font=("Arial", 12), bg="#1a1a1a", fg="white", wraplength=1000).pack(pady=5)
 
         tk.Label(scrollable_frame, text="Resource Distribution Comparison", font=("Arial", 16, "italic"), bg="#1a1a1a", fg="#4a90e2").pack(pady=10)
-        allocated_totals = [sum(self.allocated[p].values()) for p in self.processes]
-        requested_totals = [sum(self.requested[p].values()) for p in self.processes]
-
-        fig, ax = plt.subplots(figsize=(8, 4))
-        bar_width = 0.35
-        index = np.arange(len(self.processes))
-
-        ax.bar(index, allocated_totals, bar_width, label="Allocated Resources", color="#ff9999")
-        ax.bar(index + bar_width, requested_totals, bar_width, label="Requested Resources", color="#9999ff")
-        ax.set_xlabel("Processes")
-        ax.set_ylabel("Number of Resources")
-        ax.set_title("Allocated vs Requested Resources per Process")
-        ax.set_xticks(index + bar_width / 2)
-        ax.set_xticklabels(self.processes)
-        ax.legend()
-
-        hist_frame = tk.Frame(scrollable_frame, bg="#1a1a1a")
-        hist_frame.pack(pady=10)
-        hist_canvas = FigureCanvasTkAgg(fig, master=hist_frame)
-        hist_canvas.draw()
-        hist_canvas.get_tk_widget().pack()
+        with self.metrics.stage("histogram"):
+            allocated_totals = self.scenario.allocated.sum(axis=1)
+            requested_totals = self.scenario.requested.sum(axis=1)
+
+            fig, ax = plt.subplots(figsize=(8, 4))
+            if len(self.processes) <= self.histogram_bars:
+                bar_width = 0.35
+                index = np.arange(len(self.processes))
+
+                ax.bar(index, allocated_totals, bar_width, label="Allocated Resources", color="#ff9999")
+                ax.bar(index + bar_width, requested_totals, bar_width, label="Requested Resources", color="#9999ff")
+                ax.set_xlabel("Processes")
+                ax.set_ylabel("Number of Resources")
+                ax.set_title("Allocated vs Requested Resources per Process")
+                ax.set_xticks(index + bar_width / 2)
+                ax.set_xticklabels(self.processes)
+            else:
+                # One bar and tick label per process is unreadable and takes minutes to draw
+                # at this size, so show how many processes hold/request how many units
+                top = int(max(allocated_totals.max(), requested_totals.max()))
+                bins = np.arange(top + 2) - 0.5 if top < 50 else 50
+                ax.hist([allocated_totals, requested_totals], bins=bins, label=["Allocated Resources", "Requested Resources"],
+                        color=["#ff9999", "#9999ff"])
+                ax.set_xlabel("Units per Process")
+                ax.set_ylabel("Number of Processes")
+                ax.set_title(f"Allocated vs Requested Resources across {len(self.processes):,} Processes")
+            ax.legend()
+
+            hist_frame = tk.Frame(scrollable_frame, bg="#1a1a1a")
+            hist_frame.pack(pady=10)
+            hist_canvas = FigureCanvasTkAgg(fig, master=hist_frame)
+            hist_canvas.draw()
+            hist_canvas.get_tk_widget().pack()
+
+        self.add_metrics_panel(scrollable_frame)
 
         ttk.Button(scrollable_frame, text="Back to Home", command=self.back_to_home).pack(pady=15)
 
         self.apply_theme()
 
+    def show_cycles(self, parent, cycles, explanation="", page_size=10, all_cycles_seconds=10, per_component=200):
+        # Pages through a possibly lazy iterable of cycles: text is only built for the page on
+        # screen and an explanation only for the cycle clicked
+        container = tk.Frame(parent, bg="#1a1a1a")
+        container.pack(pady=5)
+
+        def enumerate_all(button):
+            # Listing every cycle of a large knot takes seconds, so it runs on a worker thread
+            # like run_simulation; per_component keeps one knot from filling the whole list
+            button.state(["disabled"])
+            status = tk.Frame(container, bg="#1a1a1a")
+            status.pack(pady=5)
+            tk.Label(status, text="Enumerating cycles...", font=("Arial", 12), bg="#1a1a1a", fg="#cccccc").pack(side="left")
+            cancel = threading.Event()
+            ttk.Button(status, text="Cancel", command=cancel.set).pack(side="left", padx=10)
+            events = queue.Queue()
+            scenario, memo = self.scenario, self.analysis_cache.cycles
+
+            def work():
+                try:
+                    events.put(("done", list(iter_scenario_cycles(scenario, DEFAULT_CYCLE_LIMIT, time_limit=all_cycles_seconds,
+                                                                  per_component=per_component, cancel=cancel, memo=memo))))
+                except AnalysisCancelled:
+                    events.put(("cancelled", None))
+                except Exception as e:
+                    events.put(("error", e))
+
+            threading.Thread(target=work, daemon=True).start()
+
+            def poll():
+                try:
+                    kind, found = events.get_nowait()
+                except queue.Empty:
+                    self.root.after(50, poll)
+                    return
+                if not status.winfo_exists():
+                    return  # the view was closed meanwhile
+                if kind == "done":
+                    populate(found, "", False)
+                    return
+                status.destroy()
+                button.state(["!disabled"])
+                if kind == "error":
+                    messagebox.showerror("Error", f"Could not enumerate cycles: {found}")
+
+            self.root.after(50, poll)
+
+        def populate(source, explanation_text, can_expand):
+            for child in container.winfo_children():
+                child.destroy()
+            source = iter(source)
+            pages = []
+            state = {"page": 0, "exhausted": False}
+            header = tk.Label(container, font=("Arial", 12, "bold"), bg="#1a1a1a", fg="white")
+            header.pack(pady=5)
+            rows = tk.Frame(container, bg="#1a1a1a")
+            rows.pack()
+            nav = tk.Frame(container, bg="#1a1a1a")
+            nav.pack(pady=5)
+            prev_button = ttk.Button(nav, text="Previous", command=lambda: show(state["page"] - 1))
+            prev_button.pack(side="left", padx=5)
+            next_button = ttk.Button(nav, text="Next", command=lambda: show(state["page"] + 1))
+            next_button.pack(side="left", padx=5)
+            if can_expand:
+                expand_button = ttk.Button(nav, text="Enumerate All Cycles", command=lambda: enumerate_all(expand_button))
+                expand_button.pack(side="left", padx=5)
+            explanation_label = tk.Label(container, text=explanation_text, font=("Arial", 12), bg="#1a1a1a", fg="white", wraplength=1000, justify="left")
+            explanation_label.pack(pady=10)
+
+            def fetch(page):
+                while len(pages) <= page and not state["exhausted"]:
+                    chunk = list(islice(source, page_size))
+                    if chunk:
+                        pages.append(chunk)
+                    state["exhausted"] = len(chunk) < page_size
+
+            def show(page):
+                fetch(page + 1)  # one page ahead, to know whether Next has anything
+                if not 0 <= page < len(pages):
+                    return
+                state["page"] = page
+                for child in rows.winfo_children():
+                    child.destroy()
+                for cycle in pages[page]:
+                    text = " → ".join(str(n) for n in cycle + cycle[:1])
+                    row = tk.Label(rows, text=text if len(text) <= 150 else text[:150] + " …", font=("Arial", 12), bg="#1a1a1a", fg="#4a90e2", cursor="hand2")
+                    row.bind("<Button-1>", lambda e, c=cycle: explanation_label.config(text=self.generate_deadlock_explanation(c)))
+                    row.pack(anchor="w")
+                first = page * page_size + 1
+                total = f"of {sum(map(len, pages))}" if state["exhausted"] else "(more available)"
+                header.config(text=f"Cycles {first}-{first + len(pages[page]) - 1} {total} — click a cycle to explain it")
+                prev_button.state(["!disabled" if page > 0 else "disabled"])
+                next_button.state(["!disabled" if page + 1 < len(pages) else "disabled"])
+
+            show(0)
+
+        populate(cycles, explanation, True)
+
+    def show_recovery_alternatives(self, parent, limit=5, max_candidates=200):
+        # Each candidate recovery is applied to a copy of the scenario and re-checked, best
+        # first. That is a detection per candidate, so it runs on a worker thread like
+        # run_simulation and the list fills in when it is done.
+        status = tk.Frame(parent, bg="#1a1a1a")
+        status.pack(anchor="w", pady=5)
+        label = tk.Label(status, text="Ranking alternative recoveries...", font=("Arial", 12), bg="#1a1a1a", fg="#cccccc")
+        label.pack(side="left")
+        cancel = threading.Event()
+        ttk.Button(status, text="Cancel", command=cancel.set).pack(side="left", padx=10)
+        events = queue.Queue()
+        scenario = self.scenario
+
+        def work():
+            try:
+                events.put(("done", explore_recoveries(scenario, max_candidates=max_candidates, cancel=cancel)))
+            except AnalysisCancelled:
+                events.put(("cancelled", None))
+            except Exception as e:
+                events.put(("error", e))
+
+        threading.Thread(target=work, daemon=True).start()
+
+        def poll():
+            try:
+                kind, ranked = events.get_nowait()
+            except queue.Empty:
+                self.root.after(50, poll)
+                return
+            if not status.winfo_exists():
+                return  # the view was closed meanwhile
+            status.destroy()
+            if kind == "cancelled":
+                tk.Label(parent, text="Ranking cancelled.", font=("Arial", 12), bg="#1a1a1a", fg="#cccccc").pack(anchor="w", pady=5)
+                return
+            if kind == "error":
+                tk.Label(parent, text=f"Could not rank alternatives: {ranked}", font=("Arial", 12), bg="#1a1a1a", fg="#ff4d4d").pack(anchor="w", pady=5)
+                return
+            if not ranked:
+                return
+            tk.Label(parent, text="Ranked Alternatives (re-checked after applying each):", font=("Arial", 14, "italic"), bg="#1a1a1a", fg="#4a90e2").pack(anchor="w", pady=5)
+            for c in ranked[:limit]:
+                what = f"Terminate {', '.join(c['victims'])}" if c["action"] == "terminate" else f"Preempt {c['resource']} from {c['victims'][0]}"
+                outcome = "deadlock-free" if c["deadlock_free"] else f"{len(c['still_deadlocked'])} process(es) still deadlocked"
+                tk.Label(parent, text=f"{what}: cost {c['cost']:g}, {outcome}, {'safe' if c['safe'] else 'unsafe'}", font=("Arial", 12), bg="#1a1a1a", fg="white", wraplength=800, justify="left").pack(anchor="w", padx=10)
+
+        self.root.after(50, poll)
+
+    def report_stage(self, record):
+        for callback in self.metrics_callbacks:
+            callback(record)
+
+    def add_metrics_panel(self, parent):
+        # Collapsed by default; lists the stage timings of this run and exports them
+        panel = tk.Frame(parent, bg="#1a1a1a")
+        body = tk.Frame(panel, bg="#1a1a1a", relief="groove", borderwidth=2)
+
+        def toggle():
+            if body.winfo_ismapped():
+                body.pack_forget()
+            else:
+                body.pack(pady=5)
+
+        ttk.Button(panel, text="Show Timings", command=toggle).pack(pady=5)
+        for record in self.metrics.stages:
+            memory = ""
+            if "heap_peak_mb" in record:
+                memory += f", heap peak {record['heap_peak_mb']:.1f} MB"
+            if "rss_growth_mb" in record:
+                memory += f", process peak +{record['rss_growth_mb']:.1f} MB"
+            tk.Label(body, text=f"{record['stage']}: {record['seconds'] * 1000:.1f} ms{memory}", font=("Arial", 12), bg="#1a1a1a", fg="white").pack(anchor="w", padx=10)
+        if self.metrics.stages and "rss_peak_mb" in self.metrics.stages[-1]:
+            tk.Label(body, text=f"Process peak RSS since start: {self.metrics.stages[-1]['rss_peak_mb']:.0f} MB", font=("Arial", 12), bg="#1a1a1a", fg="white").pack(anchor="w", padx=10)
+        counts = ", ".join(f"{k} {v}" for k, v in self.metrics.counts.items())
+        tk.Label(body, text=f"Total {self.metrics.total_seconds() * 1000:.1f} ms ({counts})", font=("Arial", 12, "italic"), bg="#1a1a1a", fg="#4a90e2").pack(anchor="w", padx=10, pady=5)
+        buttons = tk.Frame(body, bg="#1a1a1a")
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="Export JSON", command=lambda: self.export_metrics("json")).pack(side="left", padx=5)
+        ttk.Button(buttons, text="Export Prometheus", command=lambda: self.export_metrics("prom")).pack(side="left", padx=5)
+        panel.pack(pady=10)
+
+    def export_metrics(self, fmt):
+        path = filedialog.asksaveasfilename(defaultextension=f".{fmt}", filetypes=[("JSON", "*.json")] if fmt == "json" else [("Prometheus text", "*.prom")])
+        if not path:
+            return
+        with open(path, "w") as f:
+            f.write(self.metrics.to_json() if fmt == "json" else self.metrics.to_prometheus())
+
+    def replay_event_log(self):
+        path = filedialog.askopenfilename(title="Open event log", filetypes=[("Event logs", "*.log *.jsonl *.txt"), ("All files", "*")])
+        if not path:
+            return
+        self.home_frame.pack_forget()
+        self.sim_frame = tk.Frame(self.root, relief="raised", borderwidth=2, bg="#1a1a1a")
+        self.sim_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        tk.Label(self.sim_frame, text="Event Log Replay", font=("Arial", 20, "bold"), bg="#1a1a1a", fg="white").pack(pady=15)
+
+        # The first pass reads the whole log, so it runs on a worker thread like run_simulation
+        progress_frame = tk.Frame(self.sim_frame, bg="#1a1a1a")
+        progress_frame.pack(pady=20)
+        status_label = tk.Label(progress_frame, text=f"Reading {path}...", font=("Arial", 14), bg="#1a1a1a", fg="white")
+        status_label.pack(pady=5)
+        cancel = threading.Event()
+        ttk.Button(progress_frame, text="Cancel", command=cancel.set).pack(pady=10)
+
+        replay = Replay(path)
+        events = queue.Queue()
+
+        def work():
+            try:
+                replay.run(progress=lambda count, offset: events.put(("status", f"{count:,} events, {offset / 2**20:,.1f} MB read...")), cancel=cancel)
+                events.put(("done", None))
+            except AnalysisCancelled:
+                events.put(("cancelled", None))
+            except Exception as e:
+                events.put(("error", e))
+
+        threading.Thread(target=work, daemon=True).start()
+
+        def poll():
+            while True:
+                try:
+                    kind, payload = events.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "status":
+                    status_label.config(text=payload)
+                elif kind == "done":
+                    progress_frame.destroy()
+                    self.show_replay(self.sim_frame, replay)
+                    return
+                elif kind == "cancelled":
+                    self.back_to_home()
+                    return
+                else:
+                    messagebox.showerror("Replay Error", f"Could not replay {path}: {payload}")
+                    self.back_to_home()
+                    return
+            self.root.after(50, poll)
+
+        self.root.after(50, poll)
+        self.apply_theme()
+
+    def show_replay(self, parent, replay):
+        # Timeline scrubber: the slider seeks to an event (nearest checkpoint, then replay
+        # forward) and plot_rag redraws the graph as it was right after that event
+        incidents = replay.incidents
+        tk.Label(parent, text=f"{replay.length:,} events, {len(incidents)} incidents", font=("Arial", 14), bg="#1a1a1a", fg="white").pack(pady=5)
+        state_label = tk.Label(parent, text="", font=("Arial", 12), bg="#1a1a1a", fg="#cccccc")
+        state_label.pack(pady=5)
+        graph_frame = tk.Frame(parent, bg="#1a1a1a")
+
+        def seek(position):
+            position = max(0, min(replay.length, position))
+            scale.set(position)
+            state = replay.state_at(position)
+            self.scenario = None
+            self.rag = state.detector.rag.copy()
+            self.resources = [n for n, d in self.rag.nodes(data=True) if d["kind"] == "resource"]
+            deadlocked = state.deadlocked_processes()
+            state_label.config(text=f"After event {position:,}: {self.rag.number_of_nodes()} nodes, "
+                                    f"{len(deadlocked)} deadlocked processes" + (", unsafe" if state.unsafe else ""))
+            for child in graph_frame.winfo_children():
+                child.destroy()
+            plt.figure()
+            self.plot_rag(graph_frame)
+
+        scale = tk.Scale(parent, from_=0, to=replay.length, orient="horizontal", length=900, resolution=1, label="Events applied",
+                         bg="#1a1a1a", fg="white", highlightthickness=0)
+        scale.pack(pady=5)
+        # Seek when the slider is let go, not on every pixel of a drag
+        scale.bind("<ButtonRelease-1>", lambda e: seek(int(scale.get())))
+
+        nav = tk.Frame(parent, bg="#1a1a1a")
+        nav.pack(pady=5)
+        starts = [i["index"] + 1 for i in incidents]  # positions just after each incident
+        ttk.Button(nav, text="Previous Incident", command=lambda: seek(max([p for p in starts if p < scale.get()], default=0))).pack(side="left", padx=5)
+        ttk.Button(nav, text="Next Incident", command=lambda: seek(min([p for p in starts if p > scale.get()], default=replay.length))).pack(side="left", padx=5)
+        ttk.Button(nav, text="Back to Home", command=self.back_to_home).pack(side="left", padx=5)
+
+        listing = tk.Frame(parent, bg="#1a1a1a")
+        listing.pack(pady=5)
+        for incident in incidents[:20]:
+            detail = " -> ".join(incident["cycle"]) if incident["kind"] == "deadlock" else "Banker's state became unsafe"
+            text = f"#{incident['index']:,} (t={incident['t']}) {incident['event']['op']} {incident['event']['process']} {incident['event']['resource']}: {detail}"
+            ttk.Button(listing, text=text, command=lambda p=incident["index"] + 1: seek(p)).pack(anchor="w", pady=2)
+        if len(incidents) > 20:
+            tk.Label(listing, text=f"... and {len(incidents) - 20} more", font=("Arial", 12), bg="#1a1a1a", fg="#cccccc").pack(anchor="w")
+
+        graph_frame.pack(fill="both", expand=True)
+        seek(starts[0] if starts else replay.length)
+
     def show_prevention_options_window(self, deadlock_cycles):
         prevent_window = tk.Toplevel(self.root)
         prevent_window.title("Deadlock Prevention Options")
@@ -533,72 +1099,37 @@ class DeadlockVisualizer:
         apply_frame = tk.Frame(scrollable_frame, bg="#1a1a1a", relief="groove", borderwidth=2)
         apply_frame.pack(pady=10, padx=20)
 
-        cycle = deadlock_cycles[0]
-        involved_processes = [n for n in cycle if n.startswith("P")]
-        involved_resources = [n for n in cycle if n in self.resources]
-
-        if len(involved_resources) <= 2 and len(involved_resources) > 0:
-            resource = involved_resources[0]
-            holder = next((p for r, p in self.rag.edges if r == resource), None)
-            requester = next((p for p, r in self.rag.edges if r == resource), None)
-            if holder and requester and holder != requester:
-                best_method = "Resource Preemption"
-                suggestion = f"Preempt {resource} from {holder} and allocate it to {requester}."
-                explanation = f"By preempting {resource} from {holder}, {requester} can complete its task and release all resources, breaking the cycle."
-                new_rag = self.rag.copy()
-                new_rag.remove_edge(resource, holder)
-                new_rag.add_edge(resource, requester, type="assignment")
-            else:
-                best_method = "Process Termination"
-                suggestion = f"Terminate {involved_processes[0]} to release its resources ({', '.join([r for r, p in self.rag.edges if p == involved_processes[0]])})."
-                explanation = f"Terminating {involved_processes[0]} releases its resources, allowing other processes to proceed and breaking the deadlock."
-                new_rag = self.rag.copy()
-                new_rag.remove_node(involved_processes[0])
-        elif len(involved_processes) > 2:
-            best_method = "Process Termination"
-            suggestion = f"Terminate {involved_processes[0]} to release its resources ({', '.join([r for r, p in self.rag.edges if p == involved_processes[0]])})."
-            explanation = f"Terminating {involved_processes[0]} releases its resources, allowing other processes to proceed and breaking the deadlock."
-            new_rag = self.rag.copy()
-            new_rag.remove_node(involved_processes[0])
-        else:
-            best_method = "Avoidance (Banker’s Algorithm)"
-            suggestion = "Deny further requests until a safe sequence is possible."
-            explanation = "Using Banker’s Algorithm, the system would have denied the last request that led to this unsafe state, preventing the deadlock."
-            new_rag = self.rag.copy()
-
-        tk.Label(apply_frame, text=f"Applied Prevention Technique: {best_method}", font=("Arial", 16, "italic"), bg="#1a1a1a", fg="#4a90e2").pack(anchor="w", pady=5)
-        tk.Label(apply_frame, text=f"Action: {suggestion}", font=("Arial", 14), bg="#1a1a1a", fg="white", wraplength=800, justify="left").pack(anchor="w", pady=5)
-        tk.Label(apply_frame, text=f"Explanation: {explanation}", font=("Arial", 14), bg="#1a1a1a", fg="white", wraplength=800, justify="left").pack(anchor="w", pady=5)
-
         tk.Label(scrollable_frame, text="Previous State (Deadlocked):", font=("Arial", 16, "italic"), bg="#1a1a1a", fg="#ff9999").pack(pady=5)
         plt.clf()
-        pos = nx.spring_layout(self.rag)
-        nx.draw_networkx_nodes(self.rag, pos, nodelist=[p for p in self.rag.nodes if p.startswith("P")], node_color="#ff9999", node_shape="s", node_size=500)
-        nx.draw_networkx_nodes(self.rag, pos, nodelist=self.resources, node_color="#9999ff", node_shape="o", node_size=500)
-        nx.draw_networkx_edges(self.rag, pos, edgelist=[(u, v) for u, v in self.rag.edges if u in self.resources], edge_color="black", style="solid", width=2)
-        nx.draw_networkx_edges(self.rag, pos, edgelist=[(u, v) for u, v in self.rag.edges if v in self.resources], edge_color="gray", style="dashed", width=2)
-        nx.draw_networkx_labels(self.rag, pos, font_size=10)
+        self.draw_rag(self.rag)
         
         prev_canvas_frame = tk.Frame(scrollable_frame, bg="#1a1a1a")
         prev_canvas_frame.pack(pady=10)
         prev_rag_canvas = FigureCanvasTkAgg(plt.gcf(), master=prev_canvas_frame)
         prev_rag_canvas.draw()
         prev_rag_canvas.get_tk_widget().pack()
-
-        tk.Label(scrollable_frame, text="Resolved State:", font=("Arial", 16, "italic"), bg="#1a1a1a", fg="#4a90e2").pack(pady=5)
-        plt.clf()
-        pos = nx.spring_layout(new_rag)
-        nx.draw_networkx_nodes(new_rag, pos, nodelist=[p for p in new_rag.nodes if p.startswith("P")], node_color="#ff9999", node_shape="s", node_size=500)
-        nx.draw_networkx_nodes(new_rag, pos, nodelist=self.resources, node_color="#9999ff", node_shape="o", node_size=500)
-        nx.draw_networkx_edges(new_rag, pos, edgelist=[(u, v) for u, v in new_rag.edges if u in self.resources], edge_color="black", style="solid", width=2)
-        nx.draw_networkx_edges(new_rag, pos, edgelist=[(u, v) for u, v in new_rag.edges if v in self.resources], edge_color="gray", style="dashed", width=2)
-        nx.draw_networkx_labels(new_rag, pos, font_size=10)
-        
-        resolved_canvas_frame = tk.Frame(scrollable_frame, bg="#1a1a1a")
-        resolved_canvas_frame.pack(pady=10)
-        resolved_rag_canvas = FigureCanvasTkAgg(plt.gcf(), master=resolved_canvas_frame)
-        resolved_rag_canvas.draw()
-        resolved_rag_canvas.get_tk_widget().pack()
+        resolved_frame = tk.Frame(scrollable_frame, bg="#1a1a1a")
+        resolved_frame.pack()
+        base = self.layouts.layout(self.display_graph(self.rag))  # the positions just drawn
+
+        def show(plan):
+            best_method, suggestion, explanation, new_rag = plan
+            tk.Label(apply_frame, text=f"Applied Prevention Technique: {best_method}", font=("Arial", 16, "italic"), bg="#1a1a1a", fg="#4a90e2").pack(anchor="w", pady=5)
+            tk.Label(apply_frame, text=f"Action: {suggestion}", font=("Arial", 14), bg="#1a1a1a", fg="white", wraplength=800, justify="left").pack(anchor="w", pady=5)
+            tk.Label(apply_frame, text=f"Explanation: {explanation}", font=("Arial", 14), bg="#1a1a1a", fg="white", wraplength=800, justify="left").pack(anchor="w", pady=5)
+            self.show_recovery_alternatives(apply_frame)
+
+            tk.Label(resolved_frame, text="Resolved State:", font=("Arial", 16, "italic"), bg="#1a1a1a", fg="#4a90e2").pack(pady=5)
+            plt.clf()
+            self.draw_rag(new_rag, base=base)
+
+            resolved_canvas_frame = tk.Frame(resolved_frame, bg="#1a1a1a")
+            resolved_canvas_frame.pack(pady=10)
+            resolved_rag_canvas = FigureCanvasTkAgg(plt.gcf(), master=resolved_canvas_frame)
+            resolved_rag_canvas.draw()
+            resolved_rag_canvas.get_tk_widget().pack()
+
+        self.plan_recovery_in_background(deadlock_cycles, apply_frame, show)
 
         ttk.Button(scrollable_frame, text="Back to Home", command=lambda: [prevent_window.destroy(), self.create_home_page()]).pack(pady=15)
 
@@ -0,0 +1,50 @@
+# Compare the dict Banker's check with the NumPy matrix engine.
+# Run from the repo root: python benchmarks/bench_bankers.py [processes] [resources]
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from deadlock_core import bankers_safe_dicts, bankers_safe_matrix
+
+
+def make_scenario(n, m, seed=0):
+    # Safe state that needs several passes: needs grow with the process index,
+    # so early passes only finish part of the system
+    rng = np.random.default_rng(seed)
+    allocation = rng.integers(0, 3, (n, m))
+    need = rng.integers(0, 4, (n, m)) + (np.arange(n)[:, None] * 4 // n)
+    available = need.min(axis=0) + 3
+    return allocation + need, allocation, available
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    m = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    max_demand, allocation, available = make_scenario(n, m)
+
+    processes = [f"P{i}" for i in range(n)]
+    resources = [f"R{j}" for j in range(m)]
+    max_dict = {p: dict(zip(resources, row)) for p, row in zip(processes, max_demand.tolist())}
+    alloc_dict = {p: dict(zip(resources, row)) for p, row in zip(processes, allocation.tolist())}
+    avail_dict = dict(zip(resources, available.tolist()))
+
+    start = time.perf_counter()
+    reference = bankers_safe_dicts(processes, resources, avail_dict, max_dict, alloc_dict)
+    dict_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    order = bankers_safe_matrix(max_demand, allocation, available)
+    matrix_time = time.perf_counter() - start
+
+    result = None if order is None else [processes[i] for i in order]
+    print(f"{n} processes x {m} resources, safe={reference is not None}")
+    print(f"bankers_safe_dicts:  {dict_time:.3f}s")
+    print(f"bankers_safe_matrix: {matrix_time:.3f}s ({dict_time / matrix_time:.1f}x)")
+    print(f"same sequence: {result == reference}")
+
+
+if __name__ == "__main__":
+    main()
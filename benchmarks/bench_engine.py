@@ -0,0 +1,134 @@
+# Time the analysis hot paths (detection, Banker's safety, recovery planning, rendering) on
+# synthetic scenarios of increasing size, with peak memory per stage. Each run is compared
+# with the last recorded run of the same workload; --record appends to the history file.
+# Run from the repo root: python benchmarks/bench_engine.py [--sizes 100x10,1000x50] [--record]
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from aidm import DeadlockVisualizer
+from deadlock_core import bankers_safe, build_rag, find_scenario_deadlock, plan_recovery
+from deadlock_layout import LayoutCache
+from deadlock_workload import generate_scenario
+
+HISTORY = os.path.join(ROOT, "benchmarks", "history.jsonl")
+
+
+def detect(scenario):
+    scenario._graph = None  # time the index build too, not a cached one
+    return find_scenario_deadlock(scenario)
+
+
+def recover(scenario):
+    _, cycles = find_scenario_deadlock(scenario)
+    return plan_recovery(build_rag(scenario), cycles, scenario.resource_index, scenario=scenario)
+
+
+def render(scenario):
+    # The GUI's draw_rag on an off-screen figure, layout included (fresh cache each time)
+    view = object.__new__(DeadlockVisualizer)  # no Tk window needed for drawing
+    view.scenario, view.resources, view.layouts = scenario, scenario.resources, LayoutCache()
+    view.lod_threshold, view.lod_hops, view.summary = 300, 1, None
+    plt.figure(figsize=(8, 6))
+    DeadlockVisualizer.draw_rag(view, build_rag(scenario))
+    plt.gcf().canvas.draw()
+    plt.close("all")
+
+
+STAGES = {"detect": detect, "bankers": bankers_safe, "recovery": recover, "render": render}
+
+
+def measure(stage, scenario, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage(scenario)
+        best = min(best, time.perf_counter() - start)
+    # Separate pass for memory, tracemalloc would distort the timings
+    tracemalloc.start()
+    stage(scenario)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(best, 6), "peak_mb": round(peak / 2**20, 3)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def last_runs(path):
+    # Most recent record per workload key
+    runs = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    runs[record["workload"]] = record
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the deadlock analysis engine.")
+    parser.add_argument("--sizes", default="100x10,1000x50,10000x100", help="comma-separated PROCESSESxRESOURCES")
+    parser.add_argument("--density", type=float, default=0.02)
+    parser.add_argument("--instances", type=int, nargs=2, default=(1, 3), metavar=("LOW", "HIGH"))
+    parser.add_argument("--deadlocks", type=int, default=2)
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of " + ", ".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", default=HISTORY)
+    parser.add_argument("--record", action="store_true", help="append this run to the history file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="slowdown reported as a regression")
+    args = parser.parse_args()
+
+    previous = last_runs(args.history)
+    stamp = {"time": datetime.datetime.now().isoformat(timespec="seconds"), "commit": git_commit(),
+             "python": platform.python_version()}
+    records, regressions = [], 0
+    for size in args.sizes.split(","):
+        n, m = (int(x) for x in size.lower().split("x"))
+        workload = f"{n}x{m} density={args.density} instances={args.instances[0]}-{args.instances[1]} deadlocks={args.deadlocks} seed={args.seed}"
+        scenario = generate_scenario(n, m, args.density, tuple(args.instances), args.deadlocks, seed=args.seed)
+        deadlocked, _ = find_scenario_deadlock(scenario)
+        print(f"{workload}: {len(deadlocked)} deadlocked")
+
+        results = {}
+        for name in args.stages.split(","):
+            results[name] = measure(STAGES[name], scenario, args.repeat)
+            before = previous.get(workload, {}).get("stages", {}).get(name)
+            change = ""
+            if before and before["seconds"]:
+                ratio = results[name]["seconds"] / before["seconds"] - 1
+                change = f"  {ratio:+.0%} vs {previous[workload]['commit']}"
+                if ratio > args.threshold:
+                    change += "  REGRESSION"
+                    regressions += 1
+            print(f"  {name:<9} {results[name]['seconds'] * 1000:10.2f} ms  peak {results[name]['peak_mb']:8.2f} MB{change}")
+        records.append({**stamp, "workload": workload, "stages": results})
+
+    if args.record:
+        with open(args.history, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
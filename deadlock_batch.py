@@ -0,0 +1,103 @@
+# Batch analysis of captured scenarios: runs detection and Banker's safety on every
+# scenario in a process pool and writes one JSON line per scenario.
+#
+#   python deadlock_batch.py snapshots/ more.json -o results.jsonl
+#   cat scenarios.jsonl | python deadlock_batch.py -
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from deadlock_cache import AnalysisCache
+from deadlock_core import DEFAULT_CYCLE_LIMIT, Scenario, analyze, load_scenario
+
+cache = None  # per worker process, see warm_up
+
+
+def iter_jobs(inputs):
+    # Yields (name, path, text): files and directories by path, "-" as JSON Lines on stdin
+    for item in inputs:
+        if item == "-":
+            for line_no, line in enumerate(sys.stdin, 1):
+                if line.strip():
+                    yield f"<stdin>:{line_no}", None, line
+        elif os.path.isdir(item):
+            for entry in sorted(os.scandir(item), key=lambda e: e.name):
+                if entry.is_file() and entry.name.endswith((".json", ".dlsnap")):
+                    yield entry.path, entry.path, None
+        else:
+            yield item, item, None
+
+
+def warm_up(cache_dir=None):
+    # Pay the lazy numpy/networkx imports once per worker, not in the first scenario's latency
+    global cache
+    import networkx
+    import numpy
+    if cache_dir:
+        cache = AnalysisCache(path=cache_dir)
+
+
+def run_job(job, all_cycles=False, cycle_limit=DEFAULT_CYCLE_LIMIT):
+    name, path, text = job
+    start = time.perf_counter()
+    try:
+        scenario = load_scenario(path) if path is not None else Scenario.from_dict(json.loads(text))
+        analysis = cache.analyze(scenario, all_cycles, cycle_limit) if cache else analyze(scenario, all_cycles, cycle_limit)
+        result = {"scenario": name, **analysis}
+    except Exception as e:
+        result = {"scenario": name, "error": f"{type(e).__name__}: {e}"}
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze deadlock scenarios in parallel and write JSON Lines.")
+    parser.add_argument("inputs", nargs="+", help="scenario files, directories of *.json/*.dlsnap, or - for JSON Lines on stdin")
+    parser.add_argument("-o", "--output", help="write results here instead of stdout")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument("--all-cycles", action="store_true", help="enumerate every cycle instead of one witness per deadlock")
+    parser.add_argument("--cycle-limit", type=int, default=DEFAULT_CYCLE_LIMIT, help="cap on cycles reported with --all-cycles")
+    parser.add_argument("--cache", metavar="DIR", help="reuse results of scenarios already analyzed (stored as JSON in DIR)")
+    parser.add_argument("--chunksize", type=int, default=16, help="scenarios handed to a worker at a time")
+    args = parser.parse_args(argv)
+
+    job = functools.partial(run_job, all_cycles=args.all_cycles, cycle_limit=args.cycle_limit)
+    out = open(args.output, "w") if args.output else sys.stdout
+    latencies = []
+    deadlocked = unsafe = errors = 0
+    start = time.perf_counter()
+    try:
+        with multiprocessing.Pool(args.jobs, initializer=warm_up, initargs=(args.cache,)) as pool:
+            for result in pool.imap(job, iter_jobs(args.inputs), chunksize=args.chunksize):
+                out.write(json.dumps(result) + "\n")
+                latencies.append(result["latency_ms"])
+                if "error" in result:
+                    errors += 1
+                    continue
+                deadlocked += bool(result["deadlocked"])
+                unsafe += result["safe_sequence"] is None
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} scenarios in {elapsed:.2f}s ({len(latencies) / elapsed if elapsed else 0:.1f}/s, {args.jobs} workers); "
+          f"{deadlocked} deadlocked, {unsafe} unsafe, {errors} errors", file=sys.stderr)
+    print(f"latency ms: p50 {percentile(latencies, 0.5):.2f}  p95 {percentile(latencies, 0.95):.2f}  "
+          f"max {latencies[-1] if latencies else 0:.2f}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
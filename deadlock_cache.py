@@ -0,0 +1,92 @@
+# Memoized analysis. Whole results are keyed by Scenario.fingerprint() in an LRU, and
+# optionally in a directory of JSON files shared between runs and worker processes. Below
+# that, cycle lists and recovery victims are memoized per deadlocked component, so a
+# what-if edit only recomputes the components it touches.
+#
+#   cache = AnalysisCache(path=".deadlock-cache")
+#   result = cache.analyze(scenario)           # same dict as deadlock_core.analyze
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+from deadlock_core import DEFAULT_CYCLE_LIMIT, bankers_safe, find_scenario_deadlock, plan_recovery
+
+MISSING = object()  # results can legitimately be None (an unsafe state has no safe sequence)
+
+
+class LRUDict(OrderedDict):
+    def __init__(self, max_entries):
+        super().__init__()
+        self.max_entries = max_entries
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.max_entries:
+            self.popitem(last=False)
+
+
+class AnalysisCache:
+    def __init__(self, max_entries=256, path=None, max_components=4096):
+        self.results = LRUDict(max_entries)
+        self.cycles = LRUDict(max_components)   # component edges -> its cycles
+        self.victims = LRUDict(max_components)  # (component edges, costs) -> victims
+        self.path = path
+        self.hits = self.misses = 0
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def _lookup(self, key, compute):
+        if key in self.results:
+            self.hits += 1
+            return self.results.get(key)
+        value = self._load(key)
+        if value is MISSING:
+            self.misses += 1
+            value = compute()
+            self._store(key, value)
+        else:
+            self.hits += 1
+        self.results[key] = value
+        return value
+
+    def _load(self, key):
+        if not self.path:
+            return MISSING
+        try:
+            with open(os.path.join(self.path, key + ".json")) as f:
+                return json.load(f)["value"]
+        except (OSError, ValueError, KeyError):
+            return MISSING
+
+    def _store(self, key, value):
+        if not self.path:
+            return
+        # Write then rename, so concurrent readers never see half a file
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"value": value}, f)
+        os.replace(tmp, os.path.join(self.path, key + ".json"))
+
+    def detect(self, scenario, all_cycles=False, cycle_limit=DEFAULT_CYCLE_LIMIT, cancel=None, compress=False):
+        key = f"{scenario.fingerprint()}-detect-{int(all_cycles)}-{cycle_limit}" + ("-wfg" if compress else "")
+        deadlocked, cycles = self._lookup(key, lambda: list(find_scenario_deadlock(
+            scenario, all_cycles, cycle_limit, cancel, memo=self.cycles, compress=compress)))
+        return deadlocked, cycles
+
+    def bankers_safe(self, scenario):
+        return self._lookup(f"{scenario.fingerprint()}-bankers", lambda: bankers_safe(scenario))
+
+    def analyze(self, scenario, all_cycles=False, cycle_limit=DEFAULT_CYCLE_LIMIT):
+        deadlocked, cycles = self.detect(scenario, all_cycles, cycle_limit)
+        return {"deadlocked": deadlocked, "cycles": cycles, "safe_sequence": self.bankers_safe(scenario)}
+
+    def plan_recovery(self, rag, deadlock_cycles, resources, costs=None, action=None, wait_for=None, scenario=None):
+        return plan_recovery(rag, deadlock_cycles, resources, costs, action, memo=self.victims, wait_for=wait_for, scenario=scenario)
@@ -0,0 +1,1143 @@
+# Headless deadlock analysis: RAG model, detection, Banker's safety and recovery planning.
+# networkx and NumPy are imported on first use so importing this module stays cheap
+# for command-line tools and service workers; aidm.py is the tkinter front end.
+import sys
+from collections import deque
+
+DEFAULT_CYCLE_LIMIT = 1000
+
+
+class Scenario:
+    # Allocation state with names interned to indices: process i and resource j address
+    # row i and column j of int32 NumPy matrices, so wide resource vectors stay compact
+    def __init__(self, processes, resources, available, max_demand, allocated, requested):
+        import numpy as np
+        self.processes = list(processes)
+        self.resources = list(resources)
+        self.process_index = {p: i for i, p in enumerate(self.processes)}
+        self.resource_index = {r: j for j, r in enumerate(self.resources)}
+        shape = (len(self.processes), len(self.resources))
+        self.available = np.asarray(available, dtype=np.int32).reshape(shape[1])
+        self.max_demand = np.asarray(max_demand, dtype=np.int32).reshape(shape)
+        self.allocated = np.asarray(allocated, dtype=np.int32).reshape(shape)
+        self.requested = np.asarray(requested, dtype=np.int32).reshape(shape)
+        self._graph = None
+        self._wait_for = None
+        self._fingerprint = None
+
+    @classmethod
+    def from_dict(cls, data):
+        # Per-process tables may be nested {process: {resource: count}} dicts or row lists
+        processes, resources = data["processes"], data["resources"]
+
+        def rows(table):
+            if isinstance(table, dict):
+                return [[table[p][r] for r in resources] for p in processes]
+            return table
+
+        available = data["available"]
+        if isinstance(available, dict):
+            available = [available[r] for r in resources]
+        return cls(processes, resources, available, rows(data["max"]), rows(data["allocated"]), rows(data["requested"]))
+
+    def to_dict(self):
+        return {"processes": self.processes, "resources": self.resources, "available": self.available.tolist(),
+                "max": self.max_demand.tolist(), "allocated": self.allocated.tolist(), "requested": self.requested.tolist()}
+
+    def totals(self):
+        return self.available + self.allocated.sum(axis=0)
+
+    def graph(self):
+        # Indexed RAG, built on first use; assumes the matrices are not edited afterwards
+        if self._graph is None:
+            self._graph = ResourceGraph(self)
+        return self._graph
+
+    def wait_for(self):
+        # Compressed process-to-process graph, single-instance systems only; like graph()
+        if self._wait_for is None:
+            self._wait_for = WaitForGraph(self)
+        return self._wait_for
+
+    def fingerprint(self):
+        # SHA-256 of the names and matrices, e.g. to key cached analysis results; like
+        # graph(), computed once and assumes the matrices are not edited afterwards
+        if self._fingerprint is None:
+            import hashlib
+            import json
+            import numpy as np
+            h = hashlib.sha256(json.dumps([self.processes, self.resources]).encode())
+            for matrix in (self.available, self.max_demand, self.allocated, self.requested):
+                h.update(np.ascontiguousarray(matrix, dtype="<i4").tobytes())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+
+def _csr(matrix):
+    # Row pointers and column indices of the non-zero cells
+    import numpy as np
+    rows, cols = np.nonzero(matrix)
+    indptr = np.zeros(matrix.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=matrix.shape[0]), out=indptr[1:])
+    return indptr, cols.astype(np.int32)
+
+
+class ResourceGraph:
+    # Static, indexed RAG of a Scenario. Per-process held/requested lists and per-resource
+    # holder lists are CSR slices of the allocation and request matrices, so each
+    # lookup costs O(degree) instead of a scan over every edge.
+    __slots__ = ("scenario", "held", "waiting", "holders_of")
+
+    def __init__(self, scenario):
+        self.scenario = scenario
+        self.held = _csr(scenario.allocated)             # process -> resources it holds
+        self.waiting = _csr(scenario.requested)          # process -> resources it waits for
+        self.holders_of = _csr(scenario.allocated.T)     # resource -> processes holding it
+
+    def row(self, table, index):
+        indptr, indices = table
+        return indices[indptr[index]:indptr[index + 1]]
+
+    def holders(self, resource):
+        return [self.scenario.processes[i] for i in self.row(self.holders_of, self.scenario.resource_index[resource])]
+
+    def held_by(self, process):
+        return [self.scenario.resources[j] for j in self.row(self.held, self.scenario.process_index[process])]
+
+
+def build_rag(scenario):
+    import networkx as nx
+    rag = nx.DiGraph()
+    s, g = scenario, scenario.graph()
+    processes, resources = s.processes, s.resources
+    hold_ptr, hold_idx = g.holders_of
+    for j, r in enumerate(resources):
+        for i in hold_idx[hold_ptr[j]:hold_ptr[j + 1]]:
+            rag.add_edge(r, processes[i], count=int(s.allocated[i, j]))
+    req_ptr, req_idx = g.waiting
+    for i, p in enumerate(processes):
+        for j in req_idx[req_ptr[i]:req_ptr[i + 1]]:
+            rag.add_edge(p, resources[j], count=int(s.requested[i, j]))
+    for n in rag:
+        rag.nodes[n]["kind"] = "resource" if n in s.resource_index else "process"
+    return rag
+
+
+class WaitForGraph:
+    # Single-instance systems: process i -> process k when i requests a resource k holds.
+    # Resources are folded into the edges, so cycle search walks n nodes instead of n + m
+    # and one edge per blocked request instead of two. CSR rows per process; via[e] is the
+    # resource behind edge e, which maps cycles back to the RAG's [P, R, P, R, ...] form.
+    __slots__ = ("scenario", "indptr", "indices", "via", "_lists")
+
+    def __init__(self, scenario):
+        import numpy as np
+        s = scenario
+        holder = np.full(len(s.resources), -1, dtype=np.int32)
+        rows, cols = np.nonzero(s.allocated)
+        holder[cols] = rows
+        rows, cols = np.nonzero(s.requested)  # row-major, so already grouped by process
+        blocked = holder[cols] >= 0
+        rows, cols = rows[blocked], cols[blocked]
+        self.scenario = s
+        self.indptr = np.zeros(len(s.processes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(s.processes)), out=self.indptr[1:])
+        self.indices = holder[cols]
+        self.via = cols.astype(np.int32)
+        self._lists = None
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.via.nbytes
+
+    def lists(self):
+        # Plain-list copies of the arrays; element access on lists is far cheaper in loops
+        if self._lists is None:
+            self._lists = (self.indptr.tolist(), self.indices.tolist(), self.via.tolist())
+        return self._lists
+
+    def components(self, cancel=None):
+        # Cyclic SCCs as lists of process rows: iterative Tarjan over the CSR arrays
+        indptr, indices, _ = self.lists()
+        n = len(indptr) - 1
+        index, low, on_stack = [-1] * n, [0] * n, [False] * n
+        stack, found, counter = [], [], 0
+        for root in range(n):
+            if index[root] != -1 or indptr[root] == indptr[root + 1]:
+                continue
+            check_cancelled(cancel)
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [[root, indptr[root]]]
+            while work:
+                frame = work[-1]
+                v, e = frame
+                if e < indptr[v + 1]:
+                    frame[1] = e + 1
+                    w = indices[e]
+                    if index[w] == -1:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = True
+                        work.append([w, indptr[w]])
+                    elif on_stack[w] and index[w] < low[v]:
+                        low[v] = index[w]
+                    continue
+                work.pop()
+                if work and low[v] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[v]
+                if low[v] == index[v]:
+                    comp = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        comp.append(w)
+                        if w == v:
+                            break
+                    if len(comp) > 1 or v in indices[indptr[v]:indptr[v + 1]]:
+                        found.append(comp)
+        return found
+
+    def witness(self, comp, start):
+        # BFS inside the component back to start, returned as [P, R, P, R, ...] names
+        indptr, indices, via = self.lists()
+        s = self.scenario
+        members = set(comp)
+        parent = {start: None}  # row -> (previous row, edge into it)
+        queue = deque([start])
+        while queue:
+            u = queue.popleft()
+            for e in range(indptr[u], indptr[u + 1]):
+                w = indices[e]
+                if w == start:
+                    edges = [e]
+                    while parent[u] is not None:
+                        u, e = parent[u]
+                        edges.append(e)
+                    cycle, row = [], start
+                    for e in reversed(edges):
+                        cycle += [s.processes[row], s.resources[via[e]]]
+                        row = indices[e]
+                    return cycle
+                if w in members and w not in parent:
+                    parent[w] = (u, e)
+                    queue.append(w)
+        return [s.processes[start]]
+
+    def find_deadlock(self, cancel=None):
+        # Same contract as find_deadlock: (deadlocked processes, one witness per component)
+        comps = sorted((sorted(c) for c in self.components(cancel)), key=lambda c: c[0])
+        names = self.scenario.processes
+        cycles = []
+        for comp in comps:
+            check_cancelled(cancel)
+            cycles.append(self.witness(comp, comp[0]))
+        return [names[i] for i in sorted(i for c in comps for i in c)], cycles
+
+    def to_networkx(self, rows):
+        # Process-only DiGraph over the given rows, for the recovery planner
+        import networkx as nx
+        indptr, indices, _ = self.lists()
+        names = self.scenario.processes
+        members = set(rows)
+        graph = nx.DiGraph()
+        for u in rows:
+            graph.add_node(names[u])
+            graph.add_edges_from((names[u], names[w]) for w in indices[indptr[u]:indptr[u + 1]] if w in members)
+        return graph
+
+    def min_cost_victims(self, costs=None, involved=None, exact_limit=None, memo=None):
+        # min_cost_victims on the deadlocked components (those touching `involved`, if
+        # given); default costs are the units each process holds, as on the RAG
+        names = self.scenario.processes
+        comps = [c for c in self.components() if not involved or any(names[i] in involved for i in c)]
+        graph = self.to_networkx([i for c in comps for i in c])
+        if costs is None:
+            held = self.scenario.allocated.sum(axis=1)
+            costs = {names[i]: int(held[i]) for c in comps for i in c}
+        return min_cost_victims(graph, (), costs, exact_limit or EXACT_VICTIM_LIMIT,
+                                components=[{names[i] for i in c} for c in comps], memo=memo)
+
+
+def deadlocked_components(rag):
+    import networkx as nx
+    # Tarjan SCC, O(V+E); keep only components that actually contain a cycle
+    return [comp for comp in nx.strongly_connected_components(rag)
+            if len(comp) > 1 or any(rag.has_edge(n, n) for n in comp)]
+
+
+def witness_cycle(rag, component, start):
+    # BFS inside the component back to the start node, O(size of component)
+    parent = {start: None}
+    queue = deque([start])
+    while queue:
+        u = queue.popleft()
+        for v in rag.successors(u):
+            if v == start:
+                cycle = [u]
+                while parent[cycle[-1]] is not None:
+                    cycle.append(parent[cycle[-1]])
+                return cycle[::-1]
+            if v in component and v not in parent:
+                parent[v] = u
+                queue.append(v)
+    return [start]
+
+
+class AnalysisCancelled(Exception):
+    pass
+
+
+def check_cancelled(cancel):
+    # cancel: anything with is_set(), e.g. a threading.Event set from the GUI thread
+    if cancel is not None and cancel.is_set():
+        raise AnalysisCancelled()
+
+
+def find_deadlock(rag, resources=(), all_cycles=False, cycle_limit=DEFAULT_CYCLE_LIMIT, cancel=None, memo=None):
+    # Returns (deadlocked_processes, cycles): one witness cycle per deadlocked
+    # component in O(V+E), or every elementary cycle (capped) when all_cycles=True
+    resources = set(resources)
+    order = {n: i for i, n in enumerate(rag)}
+    components = sorted(deadlocked_components(rag), key=lambda c: min(order[n] for n in c))
+    processes = sorted((n for comp in components for n in comp if n not in resources), key=order.get)
+
+    cycles = []
+    if all_cycles:
+        cycles = list(iter_cycles(rag, resources, cycle_limit, cancel=cancel, components=components, memo=memo))
+    else:
+        # Start each witness at a process so explanations read "process waits for resource"
+        for comp in components:
+            check_cancelled(cancel)
+            cycles.append(witness_cycle(rag, comp, min(comp, key=lambda n: (n in resources, order[n]))))
+    return processes, cycles
+
+
+def iter_cycles(rag, resources=(), limit=DEFAULT_CYCLE_LIMIT, max_length=None, time_limit=None,
+                per_component=None, cancel=None, components=None, memo=None):
+    # Lazily yields elementary cycles of the deadlocked components, each rotated to start
+    # at a process. Stops after `limit` cycles or `time_limit` seconds; cycles longer than
+    # `max_length` nodes are pruned from the search; `per_component` caps how many come
+    # from one component, so one huge knot cannot crowd out the others.
+    # memo: dict-like of component edges -> its cycles, filled with every component that
+    # was enumerated to the end, so an edit elsewhere in the graph reuses them.
+    import time
+    import networkx as nx
+    resources = set(resources)
+    order = {n: i for i, n in enumerate(rag)}
+    if components is None:
+        components = sorted(deadlocked_components(rag), key=lambda c: min(order[n] for n in c))
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    count = 0
+    for comp in components:
+        sub = rag.subgraph(comp)
+        key = (frozenset(sub.edges), max_length, per_component)
+        cached = memo.get(key) if memo is not None else None
+        found = []
+        for taken, cycle in enumerate(cached if cached is not None else nx.simple_cycles(sub, length_bound=max_length)):
+            check_cancelled(cancel)
+            if (limit is not None and count >= limit) or (deadline is not None and time.monotonic() > deadline):
+                return
+            if per_component is not None and taken >= per_component:
+                break
+            if cached is None:
+                start = min(range(len(cycle)), key=lambda i: (cycle[i] in resources, order[cycle[i]]))
+                cycle = cycle[start:] + cycle[:start]
+                found.append(cycle)
+            yield cycle
+            count += 1
+        if memo is not None and cached is None:
+            memo[key] = found
+
+
+def bankers_safe_dicts(processes, resources, available, max_demand, allocated):
+    # Reference dict implementation, kept for benchmarking the matrix engine
+    work = available.copy()
+    finish = {p: False for p in processes}
+    need = {p: {r: max_demand[p][r] - allocated[p][r] for r in resources} for p in processes}
+    safe_sequence = []
+
+    while False in finish.values():
+        found = False
+        for p in processes:
+            if not finish[p] and all(need[p][r] <= work[r] for r in resources):
+                for r in resources:
+                    work[r] += allocated[p][r]
+                finish[p] = True
+                safe_sequence.append(p)
+                found = True
+        if not found:
+            return None
+    return safe_sequence
+
+
+def bankers_safe_matrix(max_demand, allocation, available):
+    # Banker's safety check on n x m NumPy matrices. Returns the safe sequence as
+    # row indices (same order as bankers_safe_dicts) or None if the state is unsafe.
+    import numpy as np
+    allocation = np.asarray(allocation)
+    need = np.asarray(max_demand) - allocation
+    work = np.array(available, dtype=np.int64)
+    n, m = need.shape
+    finished = np.zeros(n, dtype=bool)
+    safe_sequence = []
+
+    while len(safe_sequence) < n:
+        found = False
+        pos = 0
+        # One pass over the processes in order, handled a block at a time
+        while pos < n:
+            idx = np.flatnonzero(~finished[pos:]) + pos
+            if idx.size == 0:
+                break
+            runnable = (need[idx] <= work).all(axis=1)
+            ready, blocked = idx[runnable], idx[~runnable]
+
+            # Work seen by each blocked process once the ready ones before it have released
+            released = np.zeros((ready.size + 1, m), dtype=np.int64)
+            np.cumsum(allocation[ready], axis=0, out=released[1:])
+            before = np.searchsorted(ready, blocked)
+            seen = work + released[before]
+            unlocked = np.flatnonzero((need[blocked] <= seen).all(axis=1))
+
+            if unlocked.size:
+                first = unlocked[0]
+                j = blocked[first]
+                taken = np.append(ready[:before[first]], j)
+                work = seen[first] + allocation[j]
+                pos = j + 1
+            else:
+                taken = ready
+                work = work + released[-1]
+                pos = n
+            if taken.size:
+                finished[taken] = True
+                safe_sequence.extend(taken.tolist())
+                found = True
+        if not found:
+            return None
+    return safe_sequence
+
+
+def detect_deadlock_matrix(allocation, request, available):
+    # Detection for multi-instance resources (Coffman et al.): repeatedly let every
+    # process whose whole request fits in Work finish and release its allocation.
+    # Returns the row indices of the processes that can never finish.
+    import numpy as np
+    allocation = np.asarray(allocation)
+    request = np.asarray(request)
+    work = np.array(available, dtype=np.int64)
+    pending = np.flatnonzero(allocation.any(axis=1))
+    while pending.size:
+        runnable = (request[pending] <= work).all(axis=1)
+        if not runnable.any():
+            break
+        work = work + allocation[pending[runnable]].sum(axis=0)
+        pending = pending[~runnable]
+    return pending.tolist()
+
+
+class IncrementalDeadlockDetector:
+    # Keeps the RAG, its SCCs and a topological order of the SCCs up to date on each
+    # allocate/request/release event (Pearce-Kelly dynamic topological sort), so an
+    # event only touches the part of the graph between the two ends of the new edge.
+    MIN_WIDTH = 1e-9
+
+    def __init__(self):
+        import networkx as nx
+        self.rag = nx.DiGraph()
+        self.comp = {}        # node -> component id
+        self.members = {}     # component id -> set of nodes
+        self.ord = {}         # component id -> position in the topological order
+        self.width = {}       # component id -> size of the order interval it owns
+        self.cyclic = set()   # ids of components that contain a cycle
+        self.next_comp = 0
+        self.next_ord = 0.0
+
+    def request(self, process, resource):
+        self._add_node(process, "process")
+        self._add_node(resource, "resource")
+        return self._add_edge(process, resource)
+
+    def allocate(self, process, resource):
+        self._add_node(process, "process")
+        self._add_node(resource, "resource")
+        # Granting a request turns the request edge into an assignment edge
+        self._remove_edge(process, resource)
+        return self._add_edge(resource, process)
+
+    def release(self, process, resource):
+        self._remove_edge(resource, process)
+
+    def feed(self, events):
+        # events: iterable of (kind, process, resource); yields every event that closes a cycle
+        handlers = {"request": self.request, "allocate": self.allocate, "release": self.release}
+        for event in events:
+            kind, process, resource = event
+            cycle = handlers[kind](process, resource)
+            if cycle:
+                yield event, cycle
+
+    def is_deadlocked(self):
+        return bool(self.cyclic)
+
+    def deadlocked_processes(self):
+        return [n for c in self.cyclic for n in self.members[c] if self.rag.nodes[n]["kind"] == "process"]
+
+    def _add_node(self, node, kind):
+        if node not in self.rag:
+            self.rag.add_node(node, kind=kind)
+            self._new_comp({node}, self.next_ord, 1.0)
+            self.next_ord += 1.0
+
+    def _new_comp(self, nodes, position, width):
+        c = self.next_comp
+        self.next_comp += 1
+        self.members[c] = nodes
+        for n in nodes:
+            self.comp[n] = c
+        self.ord[c] = position
+        self.width[c] = width
+        return c
+
+    def _drop_comp(self, c):
+        del self.members[c], self.ord[c], self.width[c]
+        self.cyclic.discard(c)
+
+    def _path(self, source, target, nodes):
+        # BFS from source to target staying inside nodes
+        parent = {source: None}
+        queue = deque([source])
+        while queue:
+            x = queue.popleft()
+            if x == target:
+                break
+            for y in self.rag.successors(x):
+                if y in nodes and y not in parent:
+                    parent[y] = x
+                    queue.append(y)
+        path = [target]
+        while parent[path[-1]] is not None:
+            path.append(parent[path[-1]])
+        return path[::-1]
+
+    def _add_edge(self, u, v):
+        if self.rag.has_edge(u, v):
+            return None
+        self.rag.add_edge(u, v)
+        cu, cv = self.comp[u], self.comp[v]
+        if cu == cv:
+            # Already strongly connected (or a self-loop): the edge closes another cycle
+            self.cyclic.add(cu)
+            return [u] + self._path(v, u, self.members[cu])[:-1]
+        lb, ub = self.ord[cv], self.ord[cu]
+        if lb > ub:
+            return None
+
+        # Affected region: nodes reachable from v and nodes reaching u, within [lb, ub]
+        parent = {v: None}
+        stack = [v]
+        while stack:
+            x = stack.pop()
+            for y in self.rag.successors(x):
+                if y not in parent and self.ord[self.comp[y]] <= ub:
+                    parent[y] = x
+                    stack.append(y)
+        reaches_u = {u}
+        stack = [u]
+        while stack:
+            x = stack.pop()
+            for y in self.rag.predecessors(x):
+                if y not in reaches_u and self.ord[self.comp[y]] >= lb:
+                    reaches_u.add(y)
+                    stack.append(y)
+
+        forward = {self.comp[x] for x in parent}
+        backward = {self.comp[x] for x in reaches_u}
+        merged = forward & backward
+        key = self.ord.get
+        slots = sorted((self.ord[c], self.width[c]) for c in forward | backward)
+        before = sorted(backward - merged, key=key)
+        after = sorted(forward - merged, key=key)
+        cycle = None
+        if merged:
+            nodes = set().union(*(self.members[c] for c in merged))
+            for c in merged:
+                self._drop_comp(c)
+            middle = [self._new_comp(nodes, 0.0, 0.0)]
+            self.cyclic.add(middle[0])
+            path = [u]
+            while parent[path[-1]] is not None:
+                path.append(parent[path[-1]])
+            cycle = [u] + path[:0:-1]
+        else:
+            middle = []
+
+        # Reuse the region's slots: predecessors first, then the new SCC, then successors
+        sequence = before + middle + after
+        chosen = slots[:len(before) + len(middle)] + slots[len(slots) - len(after):]
+        for c, (position, width) in zip(sequence, chosen):
+            self.ord[c] = position
+            self.width[c] = width
+        return cycle
+
+    def _remove_edge(self, u, v):
+        if not self.rag.has_edge(u, v):
+            return
+        self.rag.remove_edge(u, v)
+        c = self.comp[u]
+        if c == self.comp[v]:
+            self._split(c)
+
+    def _split(self, c):
+        # Only the component that lost an internal edge can fall apart; recompute its SCCs
+        nodes = self.members[c]
+        parts = self._tarjan(nodes)
+        if len(parts) == 1:
+            if not self._has_cycle(parts[0]):
+                self.cyclic.discard(c)
+            return
+        position, width = self.ord[c], self.width[c]
+        self._drop_comp(c)
+        step = width / len(parts)
+        # Tarjan emits components sinks first, so walk them backwards
+        for i, part in enumerate(reversed(parts)):
+            new = self._new_comp(part, position + i * step, step)
+            if self._has_cycle(part):
+                self.cyclic.add(new)
+        if step < self.MIN_WIDTH:
+            self._renumber()
+
+    def _has_cycle(self, part):
+        return len(part) > 1 or self.rag.has_edge(next(iter(part)), next(iter(part)))
+
+    def _tarjan(self, nodes):
+        # Iterative Tarjan restricted to nodes; returns SCCs in reverse topological order
+        index, low, on_stack = {}, {}, set()
+        stack, parts = [], []
+        for root in nodes:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self.rag.successors(root)))]
+            while work:
+                x, children = work[-1]
+                for y in children:
+                    if y not in nodes:
+                        continue
+                    if y not in index:
+                        index[y] = low[y] = len(index)
+                        stack.append(y)
+                        on_stack.add(y)
+                        work.append((y, iter(self.rag.successors(y))))
+                        break
+                    if y in on_stack:
+                        low[x] = min(low[x], index[y])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[x])
+                    if low[x] == index[x]:
+                        part = set()
+                        while True:
+                            y = stack.pop()
+                            on_stack.discard(y)
+                            part.add(y)
+                            if y == x:
+                                break
+                        parts.append(part)
+        return parts
+
+    def _renumber(self):
+        for i, c in enumerate(sorted(self.ord, key=self.ord.get)):
+            self.ord[c] = float(i)
+            self.width[c] = 1.0
+        self.next_ord = float(len(self.ord))
+
+
+def bankers_safe(scenario):
+    order = bankers_safe_matrix(scenario.max_demand, scenario.allocated, scenario.available)
+    return None if order is None else [scenario.processes[i] for i in order]
+
+
+def is_single_instance(scenario):
+    return bool((scenario.totals() <= 1).all())
+
+
+def find_scenario_deadlock(scenario, all_cycles=False, cycle_limit=DEFAULT_CYCLE_LIMIT, cancel=None, memo=None,
+                           compress=False):
+    # Returns (deadlocked_processes, cycles). Single-instance systems take the O(V+E)
+    # cycle check; otherwise a cycle is not enough and the matrix algorithm decides,
+    # with witness cycles taken from the requests that can never be satisfied.
+    # compress: run the single-instance check on the wait-for graph (witnesses only;
+    # enumerating every cycle still needs the RAG, whose parallel requests it merges)
+    if compress and not all_cycles and is_single_instance(scenario):
+        return scenario.wait_for().find_deadlock(cancel)
+    if is_single_instance(scenario):
+        # The RAG lists processes resource by resource; every path reports scenario order
+        processes, cycles = find_deadlock(build_rag(scenario), scenario.resource_index, all_cycles, cycle_limit, cancel, memo)
+        return sorted(processes, key=scenario.process_index.get), cycles
+    stuck, blocking = blocking_graph(scenario, cancel)
+    if not stuck:
+        return [], []
+    _, cycles = find_deadlock(blocking, scenario.resource_index, all_cycles, cycle_limit, cancel, memo)
+    return [scenario.processes[i] for i in sorted(stuck)], cycles
+
+
+def iter_scenario_cycles(scenario, limit=DEFAULT_CYCLE_LIMIT, max_length=None, time_limit=None,
+                         per_component=None, cancel=None, memo=None):
+    # Streaming counterpart of find_scenario_deadlock(all_cycles=True), see iter_cycles
+    graph = build_rag(scenario) if is_single_instance(scenario) else blocking_graph(scenario, cancel)[1]
+    return iter_cycles(graph, scenario.resource_index, limit, max_length, time_limit, per_component, cancel, memo=memo)
+
+
+def blocking_graph(scenario, cancel=None):
+    # Multi-instance systems: (stuck process rows, graph of their holdings and of the
+    # requests that can never be satisfied). Its cycles are the witnesses of the deadlock.
+    import networkx as nx
+    processes, resources = scenario.processes, scenario.resources
+    allocated, requested = scenario.allocated, scenario.requested
+    stuck = detect_deadlock_matrix(allocated, requested, scenario.available)
+    blocking = nx.DiGraph()
+    if not stuck:
+        return stuck, blocking
+    check_cancelled(cancel)
+    # Work left once every other process has finished
+    free = scenario.totals() - allocated[stuck].sum(axis=0)
+    graph = scenario.graph()
+    for i in stuck:
+        p = processes[i]
+        for j in graph.row(graph.held, i):
+            blocking.add_edge(resources[j], p, count=int(allocated[i, j]))
+        for j in graph.row(graph.waiting, i):
+            if requested[i, j] > free[j]:
+                blocking.add_edge(p, resources[j], count=int(requested[i, j]))
+    return stuck, blocking
+
+
+def explain_deadlock(cycle, scenario=None):
+    resources = scenario.resource_index if scenario else ()
+    totals = scenario.totals() if scenario else None
+    if cycle and cycle[0] in resources:
+        cycle = cycle[1:] + cycle[:1]
+    wait_explanations = []
+    for i in range(0, len(cycle) - 1, 2):
+        process = cycle[i]
+        resource = cycle[i+1]
+        holder = cycle[(i+2) % len(cycle)]
+        if scenario:
+            p, r = scenario.process_index[process], scenario.resource_index[resource]
+            holders = scenario.graph().holders(resource)
+            wait_explanations.append(f"Process {process} is waiting for {scenario.requested[p, r]} unit(s) of {resource} "
+                                     f"({scenario.available[r]} of {totals[r]} free), which are held by {', '.join(holders)}.")
+        else:
+            wait_explanations.append(f"Process {process} is waiting for resource {resource}, which is held by Process {holder}.")
+
+    explanation = "Reason for Deadlock: Circular Wait\n\n"
+    explanation += "The deadlock occurred due to a circular wait condition, where processes form a loop waiting for resources held by others:\n"
+    explanation += "\n".join(wait_explanations) + "\n\n"
+    explanation += "Additional Conditions Present:\n"
+    explanation += f"- Mutual Exclusion: Each unit of {', '.join(cycle[1::2])} can only be held by one process at a time.\n"
+    explanation += "- Hold and Wait: Each process holds at least one resource while waiting for another.\n"
+    explanation += "- No Preemption: Resources cannot be forcibly taken; processes must release them voluntarily."
+
+    return explanation
+
+
+EXACT_VICTIM_LIMIT = 20
+EXACT_VICTIM_EXPANSIONS = 2000  # branch-and-bound steps per component before going greedy
+
+
+class _SearchExhausted(Exception):
+    pass
+
+
+def _restrict(rag, nodes):
+    succ = {n: {v for v in rag.successors(n) if v in nodes} for n in nodes}
+    pred = {n: {u for u in rag.predecessors(n) if u in nodes} for n in nodes}
+    return succ, pred
+
+
+def _copy(succ, pred):
+    return {n: set(vs) for n, vs in succ.items()}, {n: set(us) for n, us in pred.items()}
+
+
+def _remove(succ, pred, v):
+    for w in succ.pop(v):
+        pred[w].discard(v)
+    for u in pred.pop(v):
+        succ[u].discard(v)
+
+
+def _reduce(succ, pred, cost, changed=None):
+    # Peel nodes that cannot lie on a cycle and take processes with a self-loop, which
+    # every solution must contain; only `changed` nodes (default: all) are rechecked.
+    # Returns the forced victims and their cost.
+    forced, total = [], 0
+    queue = list(succ if changed is None else changed)
+    while queue:
+        v = queue.pop()
+        if v not in succ:
+            continue
+        if not succ[v] or not pred[v]:
+            neighbours = succ[v] | pred[v]
+        elif v in succ[v] and cost[v] != float("inf"):
+            forced.append(v)
+            total += cost[v]
+            neighbours = succ[v] | pred[v]
+        else:
+            continue
+        _remove(succ, pred, v)
+        queue.extend(n for n in neighbours if n in succ)
+    return forced, total
+
+
+def _shortest_cycle(succ, candidates):
+    # Shortest cycle through any candidate (BFS from each); small graphs only
+    best = None
+    for start in candidates:
+        parent = {start: None}
+        queue = deque([start])
+        while queue:
+            u = queue.popleft()
+            if start in succ[u]:
+                cycle = [u]
+                while parent[cycle[-1]] is not None:
+                    cycle.append(parent[cycle[-1]])
+                if best is None or len(cycle) < len(best):
+                    best = cycle
+                break
+            for v in succ[u]:
+                if v not in parent:
+                    parent[v] = u
+                    queue.append(v)
+    return best
+
+
+def _exact_victims(succ, pred, cost, budget, expansions):
+    # Branch and bound: some process on any remaining cycle must go, so branch on the
+    # processes of a shortest cycle. Returns (cost, victims) cheaper than budget, or None.
+    # expansions: one-item list of steps left; raises _SearchExhausted when it runs out,
+    # since dense knots well inside exact_limit can still take exponential time.
+    expansions[0] -= 1
+    if expansions[0] < 0:
+        raise _SearchExhausted
+    forced, total = _reduce(succ, pred, cost)
+    if total >= budget:
+        return None
+    if not succ:
+        return total, forced
+    cycle = _shortest_cycle(succ, [n for n in succ if cost[n] != float("inf")])
+    best = None
+    for v in sorted((n for n in cycle if cost[n] != float("inf")), key=cost.get):
+        if total + cost[v] >= budget:
+            continue
+        s, p = _copy(succ, pred)
+        _remove(s, p, v)
+        found = _exact_victims(s, p, cost, budget - total - cost[v], expansions)
+        if found:
+            budget = total + cost[v] + found[0]
+            best = (budget, forced + [v] + found[1])
+    return best
+
+
+def _closes_cycle(succ, chosen, v, limit):
+    # Would putting v back (with `chosen` still removed) create a cycle through v?
+    # Searches at most `limit` nodes and answers True when it gives up.
+    seen = set()
+    stack = [w for w in succ[v] if w not in chosen]
+    while stack:
+        u = stack.pop()
+        if u == v:
+            return True
+        if u in seen:
+            continue
+        seen.add(u)
+        if len(seen) > limit:
+            return True
+        stack.extend(w for w in succ[u] if w not in chosen and w not in seen)
+    return False
+
+
+def _greedy_victims(succ, pred, cost, redundancy_limit=3000):
+    # Weighted greedy: repeatedly take the process with the lowest cost per
+    # (in-degree x out-degree), then drop victims that turn out to be redundant
+    import heapq
+
+    def ratio(v):
+        return cost[v] / (len(pred[v]) * len(succ[v]) or 1)
+
+    original = {n: set(vs) for n, vs in succ.items()}
+    victims, _ = _reduce(succ, pred, cost)
+    heap = [(ratio(v), v) for v in succ if cost[v] != float("inf")]
+    heapq.heapify(heap)
+    while succ and heap:
+        key, v = heapq.heappop(heap)
+        if v not in succ:
+            continue
+        if key != ratio(v):
+            # Degrees only shrink, so a stale key is too low: re-queue with the current one
+            heapq.heappush(heap, (ratio(v), v))
+            continue
+        neighbours = succ[v] | pred[v]
+        _remove(succ, pred, v)
+        victims.append(v)
+        forced, _ = _reduce(succ, pred, cost, neighbours)
+        victims += forced
+        for n in neighbours:
+            if n in succ and cost[n] != float("inf"):
+                heapq.heappush(heap, (ratio(n), n))
+
+    chosen = set(victims)
+    for v in sorted(victims, key=cost.get, reverse=True):
+        chosen.discard(v)
+        if _closes_cycle(original, chosen, v, redundancy_limit):
+            chosen.add(v)
+    return [v for v in victims if v in chosen]
+
+
+def held_units(rag, process):
+    return sum(d.get("count", 1) for _, _, d in rag.in_edges(process, data=True))
+
+
+def min_cost_victims(rag, resources, costs=None, exact_limit=EXACT_VICTIM_LIMIT, components=None, memo=None):
+    # Minimum-cost set of processes whose removal breaks every cycle (weighted feedback
+    # vertex set restricted to processes). Each deadlocked SCC is solved on its own:
+    # exactly by branch and bound up to exact_limit processes, greedily above that or
+    # when the search needs more than EXACT_VICTIM_EXPANSIONS steps.
+    # costs maps process -> cost (e.g. a priority); default is the units it holds.
+    # memo: dict-like of (component edges, costs) -> solution, reused across calls.
+    # Returns (victims, total_cost).
+    victims, total = [], 0
+    for comp in components if components is not None else deadlocked_components(rag):
+        succ, pred = _restrict(rag, comp)
+        cost = {n: float("inf") if n in resources else (costs[n] if costs else held_units(rag, n)) for n in comp}
+        key = None
+        if memo is not None:
+            key = (frozenset((u, v) for u in succ for v in succ[u]), frozenset(cost.items()), exact_limit)
+            if key in memo:
+                chosen, comp_cost = memo[key]
+                victims += chosen
+                total += comp_cost
+                continue
+        chosen = None
+        if sum(1 for n in comp if n not in resources) <= exact_limit:
+            try:
+                comp_cost, chosen = _exact_victims(*_copy(succ, pred), cost, float("inf"), [EXACT_VICTIM_EXPANSIONS])
+            except _SearchExhausted:
+                pass
+        if chosen is None:
+            chosen = _greedy_victims(succ, pred, cost)
+            comp_cost = sum(cost[v] for v in chosen)
+        if key is not None:
+            memo[key] = (chosen, comp_cost)
+        victims += chosen
+        total += comp_cost
+    return victims, total
+
+
+def plan_recovery(rag, deadlock_cycles, resources, costs=None, action=None, memo=None, wait_for=None, scenario=None):
+    # Returns (best_method, suggestion, explanation, new_rag). Victims are a minimum-cost
+    # set of processes covering every deadlocked component the cycles touch. action is
+    # "preempt" or "terminate"; by default victims holding a single resource are preempted.
+    # wait_for: the scenario's WaitForGraph, to search for victims on it instead of the RAG.
+    # scenario: with multi-instance resources, victims come from its blocking graph, the
+    # graph detection used; the full RAG's components also hold cycles that are not
+    # deadlocks and processes that can still finish.
+    involved = {n for cycle in deadlock_cycles or () for n in cycle}
+    search = rag
+    if scenario is not None and not is_single_instance(scenario):
+        search = blocking_graph(scenario)[1]
+    if wait_for is not None and search is rag:
+        victims, total = wait_for.min_cost_victims(costs, involved, memo=memo)
+    else:
+        components = [comp for comp in deadlocked_components(search) if comp & involved]
+        victims, total = min_cost_victims(search, resources, costs, components=components, memo=memo)
+
+    if not victims:
+        best_method = "Avoidance (Banker’s Algorithm)"
+        suggestion = "Deny further requests until a safe sequence is possible."
+        explanation = "Using Banker’s Algorithm, the system would have denied the last request that led to this unsafe state, preventing the deadlock."
+        return best_method, suggestion, explanation, rag.copy()
+
+    if scenario is not None:
+        held = {v: scenario.graph().held_by(v) for v in victims}
+    else:
+        held = {v: list(rag.predecessors(v)) for v in victims}
+    if action is None:
+        action = "preempt" if all(len(rs) == 1 for rs in held.values()) else "terminate"
+    new_rag = rag.copy()
+    releases = ", ".join(f"{v} ({', '.join(held[v])})" for v in victims)
+    if action == "preempt":
+        best_method = "Resource Preemption"
+        suggestion = f"Preempt the resources held by {releases}; they roll back and wait."
+        explanation = (f"Taking these resources back breaks every cycle at the lowest total cost ({total:g}), "
+                       "so the waiting processes can complete and release their resources.")
+        for v in victims:
+            new_rag.remove_edges_from([(r, v) for r in held[v]])
+    else:
+        best_method = "Process Termination"
+        suggestion = f"Terminate {releases} to release their resources."
+        explanation = (f"Terminating these processes breaks every cycle at the lowest total cost ({total:g}), "
+                       "allowing the other processes to proceed.")
+        new_rag.remove_nodes_from(victims)
+    return best_method, suggestion, explanation, new_rag
+
+
+GRANT, DENY, WAIT = "grant", "deny", "wait"
+
+
+class BankersAdmission:
+    # Online Banker's avoidance: request(pid, vector) grants only if the state stays safe.
+    # Need/Available are updated in place, and for the current safe sequence we keep each
+    # process's slack (work available at its turn minus its need). Granting v to the
+    # process at position k only lowers the work seen by positions < k, so the sequence
+    # survives iff v <= slack there -- an O(k*m) check instead of a full safety pass.
+    # Requests that cannot be granted yet queue FIFO and are re-checked on release.
+    def __init__(self, scenario):
+        import numpy as np
+        self.processes = scenario.processes
+        self.process_index = scenario.process_index
+        self.max_demand = np.array(scenario.max_demand, dtype=np.int64)
+        self.allocated = np.array(scenario.allocated, dtype=np.int64)
+        self.need = self.max_demand - self.allocated
+        self.available = np.array(scenario.available, dtype=np.int64)
+        self.waiting = deque()
+        order = bankers_safe_matrix(self.max_demand, self.allocated, self.available)
+        if order is None:
+            raise ValueError("initial state is not safe")
+        self._set_sequence(order)
+
+    def _set_sequence(self, order):
+        import numpy as np
+        self.sequence = np.asarray(order, dtype=np.intp)
+        self.position = np.empty_like(self.sequence)
+        self.position[self.sequence] = np.arange(self.sequence.size)
+        work = np.zeros((self.sequence.size, self.available.size), dtype=np.int64)
+        np.cumsum(self.allocated[self.sequence[:-1]], axis=0, out=work[1:])
+        self.slack = work + self.available - self.need[self.sequence]
+
+    def _index(self, pid):
+        return self.process_index[pid] if pid in self.process_index else int(pid)
+
+    def _try(self, p, vector):
+        import numpy as np
+        if (vector > self.available).any():
+            return False
+        k = self.position[p]
+        if (self.slack[:k] >= vector).all():
+            self.slack[:k] -= vector
+            self._apply(p, vector)
+            return True
+
+        self._apply(p, vector)
+        if (self.need[p] <= self.available).all():
+            # p can finish right away, so moving it to the front keeps the rest safe
+            order = np.concatenate(([p], np.delete(self.sequence, k)))
+        else:
+            order = bankers_safe_matrix(self.max_demand, self.allocated, self.available)
+        if order is None:
+            self._apply(p, -vector)
+            return False
+        self._set_sequence(order)
+        return True
+
+    def _apply(self, p, vector):
+        self.available -= vector
+        self.allocated[p] += vector
+        self.need[p] -= vector
+
+    def request(self, pid, vector):
+        import numpy as np
+        p = self._index(pid)
+        vector = np.asarray(vector, dtype=np.int64)
+        if (vector < 0).any() or (vector > self.need[p]).any():
+            return DENY
+        if self._try(p, vector):
+            return GRANT
+        self.waiting.append((p, vector))
+        return WAIT
+
+    def release(self, pid, vector=None):
+        # Returns the queued (process, vector) requests granted as a result
+        import numpy as np
+        p = self._index(pid)
+        vector = self.allocated[p].copy() if vector is None else np.asarray(vector, dtype=np.int64)
+        if (vector < 0).any() or (vector > self.allocated[p]).any():
+            raise ValueError(f"{self.processes[p]} does not hold {vector.tolist()}")
+        # Only the work seen before p's turn grows; p's own slack is unchanged
+        self.slack[:self.position[p]] += vector
+        self._apply(p, -vector)
+        return self._drain()
+
+    def finish(self, pid):
+        # Process is done: return everything, drop its claim and anything it still had queued
+        p = self._index(pid)
+        k = self.position[p]
+        self.slack[:k] += self.allocated[p]
+        self.slack[k] += self.max_demand[p]
+        self.available += self.allocated[p]
+        self.allocated[p] = self.max_demand[p] = self.need[p] = 0
+        self.waiting = deque(item for item in self.waiting if item[0] != p)
+        return self._drain()
+
+    def _drain(self):
+        granted = []
+        for _ in range(len(self.waiting)):
+            q, request = self.waiting.popleft()
+            if (request > self.need[q]).any():
+                continue  # later grants used up the claim this request was checked against
+            if self._try(q, request):
+                granted.append((self.processes[q], request))
+            else:
+                self.waiting.append((q, request))
+        return granted
+
+
+def load_scenario(path):
+    # JSON with "processes", "resources", "available", "max", "allocated", "requested",
+    # or a binary snapshot from deadlock_snapshot.py (memory-mapped, not copied)
+    import json
+    from deadlock_snapshot import is_snapshot, load_snapshot
+    if is_snapshot(path):
+        return load_snapshot(path)
+    with open(path) as f:
+        return Scenario.from_dict(json.load(f))
+
+
+def analyze(scenario, all_cycles=False, cycle_limit=DEFAULT_CYCLE_LIMIT, metrics=None, compress=False):
+    # metrics: optional deadlock_metrics.RunMetrics to record per-stage timings in
+    if metrics is None:
+        deadlocked, cycles = find_scenario_deadlock(scenario, all_cycles, cycle_limit, compress=compress)
+        safe_sequence = bankers_safe(scenario)
+    else:
+        metrics.count(processes=len(scenario.processes), resources=len(scenario.resources))
+        with metrics.stage("detect_deadlock"):
+            deadlocked, cycles = find_scenario_deadlock(scenario, all_cycles, cycle_limit, compress=compress)
+        metrics.count(deadlocked=len(deadlocked), cycles=len(cycles))
+        with metrics.stage("bankers_safe"):
+            safe_sequence = bankers_safe(scenario)
+    return {"deadlocked": deadlocked, "cycles": cycles, "safe_sequence": safe_sequence}
+
+
+def main(argv=None):
+    import json
+    paths = sys.argv[1:] if argv is None else argv
+    compress = "--wait-for" in paths
+    paths = [p for p in paths if p != "--wait-for"]
+    if not paths:
+        print("usage: python deadlock_core.py [--wait-for] SCENARIO.json [...]", file=sys.stderr)
+        return 2
+    for path in paths:
+        print(json.dumps({"scenario": path, **analyze(load_scenario(path), compress=compress)}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
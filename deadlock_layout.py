@@ -0,0 +1,116 @@
+# Node positions for drawing resource allocation graphs, cached by graph structure so
+# re-plotting the same or a slightly changed graph does not pay for spring_layout again.
+from collections import OrderedDict
+
+
+def graph_key(rag):
+    return frozenset(rag.nodes), frozenset(rag.edges)
+
+
+def scc_layout(rag):
+    # O(V+E) layered layout: strongly connected components are laid out left to right
+    # by their depth in the condensation DAG, members on a small circle around the center
+    import math
+    import networkx as nx
+    dag = nx.condensation(rag)
+    layers = list(nx.topological_generations(dag))
+    pos = {}
+    for x, layer in enumerate(layers):
+        for y, c in enumerate(layer):
+            members = dag.nodes[c]["members"]
+            cx = 2.0 * x / max(len(layers) - 1, 1) - 1.0
+            cy = 2.0 * y / max(len(layer) - 1, 1) - 1.0 if len(layer) > 1 else 0.0
+            radius = 0.4 / max(len(layers), len(layer)) if len(members) > 1 else 0.0
+            for k, n in enumerate(sorted(members, key=str)):
+                angle = 2 * math.pi * k / len(members)
+                pos[n] = (cx + radius * math.cos(angle), cy + radius * math.sin(angle))
+    return pos
+
+
+def summarize_graph(rag, resources=(), hops=1, max_nodes=300, max_groups=20):
+    # Level-of-detail view of a big RAG: keeps the SCCs that contain a cycle plus nodes
+    # within `hops` of them (undirected), and collapses everything else into group nodes
+    # ("group", i) with kind="group", size and deadlocked attributes. At most max_nodes
+    # real nodes are kept; deadlocked SCCs that do not fit become groups themselves.
+    import networkx as nx
+    from deadlock_core import deadlocked_components
+    keep, deadlocked_groups = set(), []
+    for comp in sorted(deadlocked_components(rag), key=len):
+        if len(keep) + len(comp) <= max_nodes:
+            keep |= comp
+        else:
+            deadlocked_groups.append(comp)
+
+    frontier = set(keep)
+    hidden = set().union(*deadlocked_groups)
+    for _ in range(hops):
+        ring = set()
+        for n in frontier:
+            ring.update(rag.successors(n))
+            ring.update(rag.predecessors(n))
+        ring -= keep | hidden
+        if not ring or len(keep) + len(ring) > max_nodes:
+            break
+        keep |= ring
+        frontier = ring
+
+    rest = rag.subgraph(n for n in rag if n not in keep and n not in hidden)
+    other_groups = sorted(nx.weakly_connected_components(rest), key=len, reverse=True)
+    if len(other_groups) > max_groups:
+        other_groups[max_groups - 1:] = [set().union(*other_groups[max_groups - 1:])]
+
+    summary = nx.DiGraph()
+    for n in keep:
+        summary.add_node(n, kind="resource" if n in resources else "process")
+    group_of = {}
+    for i, members in enumerate(deadlocked_groups + other_groups):
+        name = ("group", i)
+        summary.add_node(name, kind="group", size=len(members), deadlocked=i < len(deadlocked_groups))
+        for n in members:
+            group_of[n] = name
+    for u, v in rag.edges:
+        a, b = group_of.get(u, u), group_of.get(v, v)
+        if a != b:
+            summary.add_edge(a, b)
+    return summary
+
+
+class LayoutCache:
+    # Exact structural hits reuse their positions. Otherwise spring_layout is warm-started
+    # from the last position seen for each node, so consecutive views stay aligned; graphs
+    # above spring_limit nodes get scc_layout instead.
+    def __init__(self, spring_limit=500, max_entries=32, seed=42):
+        self.spring_limit = spring_limit
+        self.max_entries = max_entries
+        self.seed = seed
+        self.layouts = OrderedDict()   # graph_key -> positions, least recently used first
+        self.positions = {}            # node -> last position drawn
+
+    def layout(self, rag, base=None):
+        # base: positions of another view (e.g. the "before" graph) that shared nodes must keep
+        import networkx as nx
+        key = graph_key(rag)
+        if base is None and key in self.layouts:
+            self.layouts.move_to_end(key)
+            return self.layouts[key]
+
+        if base is not None:
+            fixed = [n for n in rag if n in base]
+            if len(fixed) == len(rag):
+                pos = {n: base[n] for n in rag}
+            else:
+                pos = nx.spring_layout(rag, pos={n: base[n] for n in fixed} or None, fixed=fixed or None, seed=self.seed)
+        elif len(rag) > self.spring_limit:
+            pos = scc_layout(rag)
+        else:
+            known = {n: self.positions[n] for n in rag if n in self.positions}
+            # Fewer iterations when most nodes already have a sensible place
+            iterations = 15 if len(known) * 4 >= len(rag) * 3 else 50
+            pos = nx.spring_layout(rag, pos=known or None, iterations=iterations, seed=self.seed)
+
+        self.positions.update(pos)
+        self.layouts[key] = pos
+        self.layouts.move_to_end(key)
+        while len(self.layouts) > self.max_entries:
+            self.layouts.popitem(last=False)
+        return pos
@@ -0,0 +1,94 @@
+# Per-stage timing for an analysis run: wall time, how far the stage pushed the process's
+# peak RSS, optionally its own Python heap peak (tracemalloc), plus counters (nodes, edges, cycles...). Callbacks see each stage as
+# it finishes; the whole run exports as JSON or Prometheus text.
+#
+#   metrics = RunMetrics(callback=print)
+#   with metrics.stage("detect"):
+#       processes, cycles = find_scenario_deadlock(scenario)
+#   metrics.count(cycles=len(cycles))
+#   print(metrics.to_prometheus())
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux (bytes on macOS; close enough for spotting a blow-up)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RunMetrics:
+    def __init__(self, callback=None, trace_memory=False):
+        # trace_memory: record the Python heap peak of each stage with tracemalloc (slower)
+        self.callbacks = [callback] if callback else []
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.counts = {}
+        self.started = time.time()
+
+    @contextmanager
+    def stage(self, name):
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {"stage": name, "seconds": time.perf_counter() - start}
+            if tracing:
+                record["heap_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+                tracemalloc.stop()
+            rss = peak_rss_mb()
+            if rss is not None:
+                # ru_maxrss only ever grows: what belongs to this stage is how much it grew,
+                # rss_peak_mb is the peak of the whole process so far
+                record["rss_growth_mb"] = rss - rss_before
+                record["rss_peak_mb"] = rss
+            self.stages.append(record)
+            for callback in self.callbacks:
+                callback(record)
+
+    def count(self, **values):
+        self.counts.update(values)
+
+    def total_seconds(self):
+        return sum(s["seconds"] for s in self.stages)
+
+    def to_dict(self):
+        return {"started": self.started, "total_seconds": self.total_seconds(),
+                "stages": self.stages, "counts": self.counts}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self, prefix="deadlock"):
+        lines = [f"# HELP {prefix}_stage_seconds Wall time of each analysis stage in the last run.",
+                 f"# TYPE {prefix}_stage_seconds gauge"]
+        lines += [f'{prefix}_stage_seconds{{stage="{s["stage"]}"}} {s["seconds"]:.6f}' for s in self.stages]
+        heap = [s for s in self.stages if "heap_peak_mb" in s]
+        if heap:
+            lines += [f"# HELP {prefix}_stage_heap_peak_bytes Python heap peak during each stage.",
+                      f"# TYPE {prefix}_stage_heap_peak_bytes gauge"]
+            lines += [f'{prefix}_stage_heap_peak_bytes{{stage="{s["stage"]}"}} {int(s["heap_peak_mb"] * 2**20)}' for s in heap]
+        growth = [s for s in self.stages if "rss_growth_mb" in s]
+        if growth:
+            lines += [f"# HELP {prefix}_stage_rss_growth_bytes Growth of the process peak RSS during each stage.",
+                      f"# TYPE {prefix}_stage_rss_growth_bytes gauge"]
+            lines += [f'{prefix}_stage_rss_growth_bytes{{stage="{s["stage"]}"}} {int(s["rss_growth_mb"] * 2**20)}' for s in growth]
+        if self.stages and "rss_peak_mb" in self.stages[-1]:
+            lines += [f"# HELP {prefix}_rss_peak_bytes Peak resident set size of the process since it started.",
+                      f"# TYPE {prefix}_rss_peak_bytes gauge",
+                      f"{prefix}_rss_peak_bytes {int(self.stages[-1]['rss_peak_mb'] * 2**20)}"]
+        for name, value in self.counts.items():
+            lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,273 @@
+# Partitioned deadlock detection for graphs spread over several nodes. Each partition
+# owns a set of vertices and their out-edges; the coordinator never holds a whole graph.
+#   1. every partition sends its cross-partition edges
+#   2. every partition gets its entry vertices (targets of incoming cross edges) and
+#      condenses its local graph to entry -> exit reachability, plus its purely local
+#      deadlocks
+#   3. the coordinator finds the cycles of that small boundary graph and asks the
+#      partitions for the local vertices on them and the paths behind the witness edges
+# Partitions run in their own processes (or in-process with inline=True) behind pipes.
+# Every message is pickled, so bytes and CPU time are reported per phase.
+#
+#   owner = hash_owner(4)               # vertex -> partition name
+#   with Coordinator(partition_graph(build_rag(scenario), owner), owner) as c:
+#       result = c.detect()   # {"deadlocked", "cycles", "costs"}
+#
+#   python deadlock_partition.py scenario.json --partitions 4
+import argparse
+import json
+import multiprocessing
+import pickle
+import sys
+import time
+import zlib
+from collections import deque
+
+from deadlock_core import find_deadlock, load_scenario, witness_cycle
+
+
+class Partition:
+    def __init__(self, name, nodes, edges, resources=()):
+        import networkx as nx
+        self.name = name
+        self.graph = nx.DiGraph()  # local vertices and the edges between them
+        self.graph.add_nodes_from(nodes)
+        self.resources = set(resources)
+        self.cross = []            # (local u, remote v)
+        for u, v in edges:
+            if v in self.graph:
+                self.graph.add_edge(u, v)
+            else:
+                self.cross.append((u, v))
+
+    def cross_edges(self):
+        return self.cross
+
+    def summarize(self, entries):
+        # entry -> exit-source reachability over the SCC DAG, one bitset per component
+        import networkx as nx
+        g = self.graph
+        sources = sorted({u for u, _ in self.cross}, key=str)
+        bit = {u: 1 << i for i, u in enumerate(sources)}
+        dag = nx.condensation(g)
+        comp = dag.graph["mapping"]
+        masks = {}
+        for c in reversed(list(nx.topological_sort(dag))):
+            mask = 0
+            for n in dag.nodes[c]["members"]:
+                mask |= bit.get(n, 0)
+            for d in dag.successors(c):
+                mask |= masks[d]
+            masks[c] = mask
+        reach = []
+        for a in entries:
+            mask = masks[comp[a]]
+            while mask:
+                low = mask & -mask
+                u = sources[low.bit_length() - 1]
+                if u != a:
+                    reach.append((a, u))
+                mask ^= low
+        deadlocked, cycles = find_deadlock(g, self.resources)
+        boundary = set(entries) | set(sources)
+        return {"reach": reach, "deadlocked": deadlocked, "cycles": cycles,
+                "boundary_resources": [n for n in boundary if n in self.resources], "edges": g.number_of_edges() + len(self.cross)}
+
+    def expand(self, seeds, segments):
+        # seeds: {component id: local boundary vertices in it} -> local processes that sit
+        # between them (reachable from one, reaching one); segments: (a, u) -> local path
+        members = {}
+        for key, nodes in seeds.items():
+            ahead = self._search(nodes, self.graph.successors)
+            behind = self._search(nodes, self.graph.predecessors)
+            members[key] = [n for n in ahead if n in behind and n not in self.resources]
+        return {"members": members, "paths": {(a, u): self._path(a, u) for a, u in segments}}
+
+    def _search(self, starts, neighbors):
+        seen = set(starts)
+        queue = deque(starts)
+        while queue:
+            for v in neighbors(queue.popleft()):
+                if v not in seen:
+                    seen.add(v)
+                    queue.append(v)
+        return seen
+
+    def _path(self, a, u):
+        parent = {a: None}
+        queue = deque([a])
+        while queue:
+            x = queue.popleft()
+            if x == u:
+                break
+            for v in self.graph.successors(x):
+                if v not in parent:
+                    parent[v] = x
+                    queue.append(v)
+        path = [u]
+        while parent[path[-1]] is not None:
+            path.append(parent[path[-1]])
+        return path[::-1]
+
+
+def partition_graph(rag, owner):
+    # Split a graph by owner(vertex); each edge lives with its source vertex
+    parts = {}
+    for n, data in rag.nodes(data=True):
+        nodes, edges, resources = parts.setdefault(owner(n), (set(), [], set()))
+        nodes.add(n)
+        if data.get("kind") == "resource":
+            resources.add(n)
+    for u, v in rag.edges:
+        parts[owner(u)][1].append((u, v))
+    return [Partition(name, *parts[name]) for name in sorted(parts, key=str)]
+
+
+def _serve(conn, partition):
+    # Partition process: (method, args) in, (result, CPU seconds) out, until None
+    while True:
+        message = pickle.loads(conn.recv_bytes())
+        if message is None:
+            break
+        method, args = message
+        start = time.process_time()
+        result = getattr(partition, method)(*args)
+        conn.send_bytes(pickle.dumps((result, time.process_time() - start)))
+
+
+class Coordinator:
+    def __init__(self, partitions, owner, inline=False):
+        # owner(vertex) -> partition name, the same mapping partition_graph split by
+        self.partitions = partitions
+        self.position = {p.name: i for i, p in enumerate(partitions)}
+        self.owner = owner
+        self.inline = inline
+        self.workers = []
+        self.costs = []
+        if not inline:
+            for p in partitions:
+                here, there = multiprocessing.Pipe()
+                worker = multiprocessing.Process(target=_serve, args=(there, p), daemon=True)
+                worker.start()
+                self.workers.append((worker, here))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for worker, conn in self.workers:
+            conn.send_bytes(pickle.dumps(None))
+            worker.join()
+        self.workers = []
+
+    def call(self, method, args):
+        # Sends every partition its request at once, then collects the replies
+        wall = time.perf_counter()
+        requests = [pickle.dumps((method, a)) for a in args]
+        if self.inline:
+            replies = []
+            for p, request in zip(self.partitions, requests):
+                method, a = pickle.loads(request)
+                start = time.process_time()
+                result = getattr(p, method)(*a)
+                replies.append(pickle.dumps((result, time.process_time() - start)))
+        else:
+            for (_, conn), request in zip(self.workers, requests):
+                conn.send_bytes(request)
+            replies = [conn.recv_bytes() for _, conn in self.workers]
+        results, cpu = zip(*(pickle.loads(r) for r in replies))
+        self.costs.append({"phase": method, "messages": 2 * len(requests),
+                           "bytes_sent": sum(map(len, requests)), "bytes_received": sum(map(len, replies)),
+                           "partition_cpu": sum(cpu), "max_partition_cpu": max(cpu),
+                           "wall": time.perf_counter() - wall})
+        return results
+
+    def detect(self):
+        import networkx as nx
+        self.costs = []
+        k = len(self.partitions)
+        cpu = time.process_time()
+        cross = self.call("cross_edges", [()] * k)
+
+        entries = [set() for _ in range(k)]
+        for edges in cross:
+            for _, v in edges:
+                entries[self.position[self.owner(v)]].add(v)
+        summaries = self.call("summarize", [(sorted(e, key=str),) for e in entries])
+
+        # Boundary graph: cross edges plus each partition's entry -> exit reachability
+        boundary = nx.DiGraph()
+        for i, (edges, summary) in enumerate(zip(cross, summaries)):
+            boundary.add_edges_from(edges, partition=None)
+            boundary.add_edges_from(summary["reach"], partition=i)
+        resources = {n for s in summaries for n in s["boundary_resources"]}
+        deadlocked = {n for s in summaries for n in s["deadlocked"]}
+        cycles = [c for s in summaries for c in s["cycles"]]
+
+        seeds = [{} for _ in range(k)]
+        segments = [set() for _ in range(k)]
+        witnesses = []
+        for key, comp in enumerate(nx.strongly_connected_components(boundary)):
+            if len(comp) < 2:
+                continue
+            sub = boundary.subgraph(comp)
+            if all(d["partition"] is not None for _, _, d in sub.edges(data=True)):
+                continue  # only one partition's summary edges: already a local deadlock
+            for n in comp:
+                seeds[self.position[self.owner(n)]].setdefault(key, []).append(n)
+            cycle = witness_cycle(sub, comp, min(comp, key=lambda n: (n in resources, str(n))))
+            for a, b in zip(cycle, cycle[1:] + cycle[:1]):
+                part = boundary.edges[a, b]["partition"]
+                if part is not None:
+                    segments[part].add((a, b))
+            witnesses.append(cycle)
+
+        if witnesses:
+            expanded = self.call("expand", [(seeds[i], sorted(segments[i], key=str)) for i in range(k)])
+            paths = {}
+            for reply in expanded:
+                paths.update(reply["paths"])
+                for members in reply["members"].values():
+                    deadlocked.update(members)
+            for cycle in witnesses:
+                full = []
+                for a, b in zip(cycle, cycle[1:] + cycle[:1]):
+                    full += paths.get((a, b), [a, b])[:-1]
+                cycles.append(full)
+
+        partition_cpu = sum(c["partition_cpu"] for c in self.costs)
+        return {"deadlocked": sorted(deadlocked, key=str), "cycles": cycles, "costs": self.costs,
+                "boundary_nodes": boundary.number_of_nodes(), "boundary_edges": boundary.number_of_edges(),
+                "edges": sum(s["edges"] for s in summaries),
+                "coordinator_cpu": time.process_time() - cpu - (partition_cpu if self.inline else 0)}
+
+
+def hash_owner(partitions):
+    # Stable across runs and processes, unlike hash()
+    return lambda n: zlib.crc32(str(n).encode()) % partitions
+
+
+def main(argv=None):
+    from deadlock_core import blocking_graph, build_rag, is_single_instance
+    parser = argparse.ArgumentParser(description="Detect deadlocks with the graph split across partitions.")
+    parser.add_argument("scenario")
+    parser.add_argument("--partitions", type=int, default=4)
+    parser.add_argument("--inline", action="store_true", help="run the partitions in this process")
+    args = parser.parse_args(argv)
+
+    scenario = load_scenario(args.scenario)
+    # Multi-instance resources: partition the blocking graph, whose cycles are the deadlock
+    graph = build_rag(scenario) if is_single_instance(scenario) else blocking_graph(scenario)[1]
+    for n in graph:
+        graph.nodes[n]["kind"] = "resource" if n in scenario.resource_index else "process"
+    owner = hash_owner(args.partitions)
+    with Coordinator(partition_graph(graph, owner), owner, args.inline) as coordinator:
+        print(json.dumps(coordinator.detect()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# What-if exploration of recoveries: builds candidate terminations (one victim, pairs,
+# ..., plus the minimum-cost victim set) and preemptions (each resource a deadlocked
+# process holds), applies each to a copy of the scenario, re-runs detection and Banker's
+# safety on the result and ranks the candidates. Large candidate sets are scored in a
+# process pool; the scenario is sent to each worker once, candidates are small tuples.
+#
+#   for c in explore_recoveries(scenario)[:5]:
+#       print(c["action"], c["victims"], c["resource"], c["cost"], c["deadlock_free"], c["safe"])
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from deadlock_core import (Scenario, bankers_safe, blocking_graph, build_rag, check_cancelled, find_scenario_deadlock,
+                           is_single_instance, min_cost_victims)
+
+POOL_THRESHOLD = 64  # fewer candidates than this are scored in-process
+
+
+def apply_recovery(scenario, action, victims, resource=None):
+    # New Scenario after terminating `victims` (their rows go away and everything they
+    # held is freed) or preempting `resource` from the single victim, which rolls back
+    # and requests those units again
+    s = scenario
+    if action == "terminate":
+        rows = [s.process_index[p] for p in victims]
+        keep = np.setdiff1d(np.arange(len(s.processes)), rows)
+        available = s.available + s.allocated[rows].sum(axis=0)
+        return Scenario([s.processes[i] for i in keep], s.resources, available,
+                        s.max_demand[keep], s.allocated[keep], s.requested[keep])
+    p, r = s.process_index[victims[0]], s.resource_index[resource]
+    allocated, requested, available = s.allocated.copy(), s.requested.copy(), s.available.copy()
+    units = allocated[p, r]
+    available[r] += units
+    requested[p, r] += units
+    allocated[p, r] = 0
+    return Scenario(s.processes, s.resources, available, s.max_demand, allocated, requested)
+
+
+def candidates(scenario, deadlocked, max_victims=2, max_candidates=5000, costs=None):
+    # (action, victims, resource) tuples: the minimum-cost victim set first, then single
+    # terminations, every preemption, then multi-victim terminations among the deadlocked
+    # processes. Generation stops at max_candidates: the pairs of a large deadlock alone
+    # would be millions of tuples.
+    graph = build_rag(scenario) if is_single_instance(scenario) else blocking_graph(scenario)[1]
+    best, _ = min_cost_victims(graph, scenario.resource_index, costs)
+    return list(itertools.islice(_generate(scenario, deadlocked, best, max_victims), max_candidates))
+
+
+def _generate(scenario, deadlocked, best, max_victims):
+    if best:
+        yield "terminate", tuple(best), None
+    seen = {frozenset(best)}
+    for p in deadlocked:
+        if frozenset([p]) not in seen:
+            yield "terminate", (p,), None
+    graph = scenario.graph()
+    for p in deadlocked:
+        for r in graph.held_by(p):
+            yield "preempt", (p,), r
+    for k in range(2, max_victims + 1):
+        for victims in itertools.combinations(deadlocked, k):
+            if frozenset(victims) not in seen:
+                seen.add(frozenset(victims))
+                yield "terminate", victims, None
+
+
+def score(scenario, candidate, costs=None):
+    action, victims, resource = candidate
+    after = apply_recovery(scenario, action, victims, resource)
+    deadlocked, _ = find_scenario_deadlock(after)
+    # Terminating a process costs costs[p] (default: the units it holds); preempting part
+    # of its holdings costs the same share of that, so both actions rank on one scale
+    if action == "terminate":
+        cost = sum(costs[p] if costs else int(scenario.allocated[scenario.process_index[p]].sum()) for p in victims)
+    else:
+        held = scenario.allocated[scenario.process_index[victims[0]]]
+        units = int(held[scenario.resource_index[resource]])
+        cost = costs[victims[0]] * units / int(held.sum()) if costs else units
+    return {"action": action, "victims": list(victims), "resource": resource, "cost": cost,
+            "deadlock_free": not deadlocked, "still_deadlocked": deadlocked,
+            "safe": bankers_safe(after) is not None}
+
+
+_worker_scenario = None
+_worker_costs = None
+
+
+def _init_worker(scenario, costs):
+    global _worker_scenario, _worker_costs
+    _worker_scenario, _worker_costs = scenario, costs
+
+
+def _score_in_worker(candidate):
+    return score(_worker_scenario, candidate, _worker_costs)
+
+
+def rank(scored):
+    # Deadlock-free first, then safe, then cheapest, then fewest victims
+    return sorted(scored, key=lambda c: (not c["deadlock_free"], not c["safe"], c["cost"], len(c["victims"])))
+
+
+def explore_recoveries(scenario, max_victims=2, max_candidates=5000, costs=None, jobs=None, cancel=None):
+    # Ranked list of scored candidates for the scenario's current deadlock (empty if none).
+    # cancel (a threading.Event) is checked between candidates and raises AnalysisCancelled.
+    deadlocked, _ = find_scenario_deadlock(scenario, cancel=cancel)
+    if not deadlocked:
+        return []
+    todo = candidates(scenario, deadlocked, max_victims, max_candidates, costs)
+    jobs = jobs or os.cpu_count()
+    if len(todo) < POOL_THRESHOLD or jobs == 1:
+        scored = []
+        for c in todo:
+            check_cancelled(cancel)
+            scored.append(score(scenario, c, costs))
+        return rank(scored)
+    pool = ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(scenario, costs))
+    try:
+        scored = []
+        for result in pool.map(_score_in_worker, todo, chunksize=max(1, len(todo) // (jobs * 4))):
+            check_cancelled(cancel)
+            scored.append(result)
+        return rank(scored)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
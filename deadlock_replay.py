@@ -0,0 +1,254 @@
+# Offline replay of lock-manager event logs. The log is streamed line by line (never
+# loaded whole) into an IncrementalDeadlockDetector, and every event that closes a cycle
+# or first makes the Banker's state unsafe is reported with its index and timestamp.
+# A full pass leaves periodic checkpoints behind, so state_at(i) only replays the events
+# since the nearest one.
+#
+# One event per line, JSON or whitespace-separated "t op process resource [units]":
+#   {"t": 12.5, "op": "request", "process": "P1", "resource": "R1"}
+#   12.7 allocate P1 R1           (also "acquire"; units default to 1)
+#   13.0 release P1 R1            (units default to everything P1 holds of R1)
+#   0 resource - R1 4             declares 4 units of R1 (needed for the Banker's check)
+#   0 claim P1 R1 2               declares P1's maximum claim on R1
+#
+# Once unit totals are declared a cycle is no longer proof of deadlock: it is reported
+# only if the matrix algorithm agrees that its processes can never proceed.
+#
+#   python deadlock_replay.py incident.log
+#   python deadlock_replay.py incident.log --at 1500000
+import argparse
+import bisect
+import json
+import pickle
+import sys
+
+from deadlock_core import IncrementalDeadlockDetector, Scenario, bankers_safe_matrix, check_cancelled, find_scenario_deadlock
+
+OPS = {"request", "allocate", "acquire", "release", "resource", "claim"}
+
+
+def parse_event(line):
+    # (t, op, process, resource, units) or None for blank lines and comments
+    line = line.strip()
+    if not line or line.startswith(b"#"):
+        return None
+    if line.startswith(b"{"):
+        d = json.loads(line)
+        if "op" not in d:
+            raise ValueError("event has no op")
+        t, op, process, resource, units = d.get("t"), d["op"], d.get("process"), d.get("resource"), d.get("units")
+    else:
+        parts = line.decode().split()
+        if len(parts) < 4:
+            raise ValueError(f"expected 't op process resource [units]', got {line[:80]!r}")
+        t, op, process, resource = parts[:4]
+        units = parts[4] if len(parts) > 4 else None
+        try:
+            t = float(t)
+        except ValueError:
+            pass  # keep non-numeric timestamps (ISO dates...) as written
+    if op not in OPS:
+        raise ValueError(f"unknown op {op!r}")
+    if resource is None or (process is None and op != "resource"):
+        raise ValueError(f"{op} needs a process and a resource")
+    if units is None and op in ("resource", "claim"):
+        raise ValueError(f"{op} needs units")
+    return t, "allocate" if op == "acquire" else op, process, resource, None if units is None else int(units)
+
+
+class ReplayState:
+    def __init__(self):
+        self.detector = IncrementalDeadlockDetector()
+        self.held = {}    # (process, resource) -> units
+        self.in_use = {}  # resource -> units held by anyone
+        self.totals = {}  # resource -> units, from "resource" events
+        self.claims = {}  # process -> {resource: max units}, from "claim" events
+        self.requested = {}  # (process, resource) -> units waited for
+        self.stuck = set()  # deadlocked processes, once totals are declared
+        self.unsafe = False
+
+    def apply(self, index, event):
+        # Applies one event; returns the incidents it causes
+        t, op, process, resource, units = event
+        incidents = []
+        cycle = None
+        if op == "request":
+            self.requested[process, resource] = 1 if units is None else units
+            cycle = self.detector.request(process, resource)
+        elif op == "allocate":
+            units = 1 if units is None else units
+            self.requested.pop((process, resource), None)
+            self.held[process, resource] = self.held.get((process, resource), 0) + units
+            self.in_use[resource] = self.in_use.get(resource, 0) + units
+            cycle = self.detector.allocate(process, resource)
+        elif op == "release":
+            have = self.held.get((process, resource), 0)
+            units = have if units is None else min(units, have)
+            self.in_use[resource] = self.in_use.get(resource, 0) - units
+            if have - units > 0:
+                self.held[process, resource] = have - units
+            else:
+                self.held.pop((process, resource), None)
+                self.detector.release(process, resource)
+        elif op == "resource":
+            self.totals[resource] = units
+        else:
+            self.claims.setdefault(process, {})[resource] = units
+
+        if self.totals and (cycle or (self.stuck and op == "release") or self._on_cycle(process, resource)):
+            # Multi-unit resources: the detector's cycles are only candidates
+            cycle = self._confirm()
+        if cycle:
+            incidents.append({"index": index, "t": t, "kind": "deadlock", "cycle": cycle,
+                              "event": {"op": op, "process": process, "resource": resource}})
+        # Only allocations and claims can make the state unsafe; a release can make it safe again
+        if self.claims and self.totals and (op in ("allocate", "claim") or (op == "release" and self.unsafe)):
+            if op == "allocate" and not self.unsafe and self._can_finish(process):
+                pass  # the process that grew can still finish, so the old safe order still works
+            else:
+                unsafe = not self.is_safe()
+                if unsafe and not self.unsafe:
+                    incidents.append({"index": index, "t": t, "kind": "unsafe",
+                                      "event": {"op": op, "process": process, "resource": resource}})
+                self.unsafe = unsafe
+        return incidents
+
+    def _on_cycle(self, *nodes):
+        # Only events touching a cyclic part of the graph can deadlock more processes
+        d = self.detector
+        return any(d.comp.get(n) in d.cyclic for n in nodes)
+
+    def _confirm(self):
+        # Re-checks the state with the matrix algorithm; returns a cycle through processes
+        # that have just become deadlocked, if any. Only processes that can reach a cycle
+        # of the graph can be stuck; everyone else finishes, so their units count as free.
+        import numpy as np
+        d = self.detector
+        region = {n for c in d.cyclic for n in d.members[c]}
+        queue = list(region)
+        while queue:
+            for u in d.rag.predecessors(queue.pop()):
+                if u not in region:
+                    region.add(u)
+                    queue.append(u)
+        processes = sorted((n for n in region if d.rag.nodes[n]["kind"] == "process"), key=str)
+        resources = sorted({r for p in processes for r in d.rag.predecessors(p)} |
+                           {r for p in processes for r in d.rag.successors(p)}, key=str)
+        ri = {r: j for j, r in enumerate(resources)}
+        allocated = np.zeros((len(processes), len(resources)), dtype=np.int64)
+        requested = np.zeros_like(allocated)
+        for i, p in enumerate(processes):
+            for r in d.rag.predecessors(p):
+                allocated[i, ri[r]] = self.held.get((p, r), 1)
+            for r in d.rag.successors(p):
+                requested[i, ri[r]] = self.requested.get((p, r), 1)
+        # Resources without a declared total count as one unit (or what is held of them)
+        totals = np.array([self.totals.get(r, max(1, self.in_use.get(r, 0))) for r in resources], dtype=np.int64)
+        scenario = Scenario(processes, resources, totals - allocated.sum(axis=0), allocated + requested, allocated, requested)
+        deadlocked, cycles = find_scenario_deadlock(scenario)
+        new = set(deadlocked) - self.stuck
+        self.stuck = set(deadlocked)
+        return next((c for c in cycles if new.intersection(c)), None) if new else None
+
+    def _can_finish(self, process):
+        claim = self.claims.get(process, {})
+        return all(claim.get(r, 0) - self.held.get((process, r), 0) <= self.totals.get(r, 0) - self.in_use.get(r, 0)
+                   for r in claim)
+
+    def is_safe(self):
+        import numpy as np
+        resources = list(self.totals)
+        processes = sorted(set(self.claims) | {p for p, _ in self.held}, key=str)
+        allocation = np.array([[self.held.get((p, r), 0) for r in resources] for p in processes], dtype=np.int64).reshape(len(processes), len(resources))
+        claims = np.array([[self.claims.get(p, {}).get(r, 0) for r in resources] for p in processes], dtype=np.int64).reshape(allocation.shape)
+        available = np.array([self.totals[r] - self.in_use.get(r, 0) for r in resources], dtype=np.int64)
+        return bankers_safe_matrix(np.maximum(claims, allocation), allocation, available) is not None
+
+    def deadlocked_processes(self):
+        if self.totals:
+            return sorted(self.stuck, key=str)
+        return self.detector.deadlocked_processes()
+
+
+class Replay:
+    def __init__(self, path, checkpoint_every=100000):
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self.checkpoints = [(0, 0, pickle.dumps(ReplayState()))]  # (event index, byte offset, state)
+        self.incidents = []
+        self.length = None  # number of events, known after run()
+
+    def events(self, offset=0, index=0):
+        # Yields (index, offset just past the event's line, event) from a byte offset
+        start = offset
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for number, line in enumerate(f, 1):
+                offset += len(line)
+                try:
+                    event = parse_event(line)
+                except (ValueError, TypeError) as e:
+                    # A full pass reads from the start, so there the line number is exact
+                    where = f"line {number}" if start == 0 else f"byte {offset - len(line)}"
+                    raise ValueError(f"{self.path}, {where}: {e}") from None
+                if event is not None:
+                    yield index, offset, event
+                    index += 1
+
+    def run(self, on_incident=None, progress=None, cancel=None):
+        # Full pass: collects incidents and checkpoints. progress(index, offset) is called
+        # at every checkpoint, cancel (a threading.Event) is checked as often.
+        state = ReplayState()
+        self.checkpoints = [(0, 0, pickle.dumps(state))]
+        self.incidents = []
+        count = 0
+        for index, offset, event in self.events():
+            for incident in state.apply(index, event):
+                self.incidents.append(incident)
+                if on_incident:
+                    on_incident(incident)
+            count = index + 1
+            if count % self.checkpoint_every == 0:
+                self.checkpoints.append((count, offset, pickle.dumps(state)))
+                if progress:
+                    progress(count, offset)
+                check_cancelled(cancel)
+        self.length = count
+        return self.incidents
+
+    def state_at(self, index):
+        # State after the first `index` events
+        i = bisect.bisect_right([c[0] for c in self.checkpoints], index) - 1
+        start, offset, blob = self.checkpoints[i]
+        state = pickle.loads(blob)
+        if start < index:
+            for j, _, event in self.events(offset, start):
+                state.apply(j, event)
+                if j + 1 >= index:
+                    break
+        return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a lock event log and report deadlocks and unsafe states.")
+    parser.add_argument("log")
+    parser.add_argument("--checkpoint-every", type=int, default=100000)
+    parser.add_argument("--at", type=int, help="after the pass, print the state after this many events")
+    args = parser.parse_args(argv)
+
+    replay = Replay(args.log, args.checkpoint_every)
+    try:
+        replay.run(on_incident=lambda incident: print(json.dumps(incident)))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"{replay.length} events, {len(replay.incidents)} incidents, {len(replay.checkpoints)} checkpoints", file=sys.stderr)
+    if args.at is not None:
+        state = replay.state_at(args.at)
+        print(json.dumps({"at": args.at, "edges": state.detector.rag.number_of_edges(),
+                          "deadlocked": state.deadlocked_processes(), "unsafe": state.unsafe}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+# Long-running detection service for lock managers. Clients connect over TCP (or a Unix
+# socket) and exchange JSON Lines:
+#
+#   {"op": "request", "process": "P1", "resource": "R1"}      also "allocate", "release"
+#   {"op": "snapshot", "id": 7, "scenario": {...}}             -> {"id": 7, "deadlocked": [...], ...}
+#   {"op": "status"}                                           -> {"deadlocked": [...], "events": n}
+#   {"op": "subscribe"}                                        -> {"alert": "deadlock", ...} as cycles form
+#
+# Events are applied in arrival order to one IncrementalDeadlockDetector, in batches, on a
+# worker thread so the event loop keeps accepting clients. An event carrying an "id" is
+# acknowledged once its batch has been applied; a status reply covers every event queued
+# before it. Snapshots are analyzed in a process pool.
+#
+#   python deadlock_service.py --port 7878
+#   python deadlock_service.py --unix /tmp/deadlock.sock
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from deadlock_batch import run_job, warm_up
+from deadlock_core import IncrementalDeadlockDetector
+
+EVENT_OPS = ("request", "allocate", "release")
+MAX_LINE = 64 * 1024 * 1024         # snapshots arrive as one JSON line
+MAX_SUBSCRIBER_BACKLOG = 1024 * 1024  # drop subscribers that stop reading
+
+
+class DetectionService:
+    def __init__(self, jobs=None, batch_size=4096):
+        self.detector = IncrementalDeadlockDetector()
+        self.batch_size = batch_size
+        self.jobs = jobs
+        self.events_applied = 0
+        self.subscribers = set()
+        self.events = None
+        self.pool = None
+        self.detector_thread = None
+
+    async def start(self):
+        self.events = asyncio.Queue()
+        self.pool = ProcessPoolExecutor(self.jobs, initializer=warm_up)
+        # One thread keeps events in order; the detector itself is not thread-safe
+        self.detector_thread = ThreadPoolExecutor(1)
+        return asyncio.create_task(self.apply_events())
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        self.detector_thread.shutdown(cancel_futures=True)
+
+    async def apply_events(self):
+        # Whatever queued up while the previous batch was being applied becomes the next batch
+        loop = asyncio.get_running_loop()
+        while True:
+            # A status query (queued as event None) ends the batch, so its answer reflects
+            # every event sent before it and is read on the detector's own thread
+            batch = [await self.events.get()]
+            while len(batch) < self.batch_size and not self.events.empty() and batch[-1][0] is not None:
+                batch.append(self.events.get_nowait())
+            events = [event for event, _, _ in batch if event is not None]
+            closed = []
+            if events:
+                try:
+                    closed = await loop.run_in_executor(self.detector_thread, self._feed, events)
+                except Exception as e:
+                    print(f"event batch failed: {type(e).__name__}: {e}", file=sys.stderr)
+            self.events_applied += len(events)
+
+            for event, request_id, writer in batch:
+                if event is not None and request_id is not None:
+                    self.send(writer, {"id": request_id, "ok": True})
+            for (kind, process, resource), cycle in closed:
+                self.publish({"alert": "deadlock", "event": {"op": kind, "process": process, "resource": resource},
+                              "cycle": cycle})
+            if batch[-1][0] is None:
+                _, request_id, writer = batch[-1]
+                deadlocked = await loop.run_in_executor(self.detector_thread, self.detector.deadlocked_processes)
+                self.send(writer, {"id": request_id, "deadlocked": deadlocked, "events": self.events_applied})
+
+    def _feed(self, events):
+        return list(self.detector.feed(events))
+
+    def publish(self, message):
+        line = (json.dumps(message) + "\n").encode()
+        for writer in list(self.subscribers):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BACKLOG:
+                self.subscribers.discard(writer)
+                writer.close()
+            else:
+                writer.write(line)
+
+    def send(self, writer, message):
+        if not writer.is_closing():
+            writer.write((json.dumps(message) + "\n").encode())
+
+    async def analyze_snapshot(self, writer, message):
+        loop = asyncio.get_running_loop()
+        job = (message.get("id"), None, json.dumps(message.get("scenario")))
+        result = await loop.run_in_executor(self.pool, run_job, job)
+        result["id"] = result.pop("scenario")
+        self.send(writer, result)
+        if result.get("deadlocked"):
+            self.publish({"alert": "deadlock", "snapshot": result["id"], "processes": result["deadlocked"],
+                          "cycles": result["cycles"]})
+
+    async def handle_client(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError) as e:  # ValueError: line over MAX_LINE
+                    self.send(writer, {"error": f"{type(e).__name__}: {e}"})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    message = json.loads(line)
+                    op = message["op"]
+                except (ValueError, KeyError, TypeError) as e:
+                    self.send(writer, {"error": f"bad message: {e}"})
+                    continue
+
+                if op in EVENT_OPS:
+                    if "process" not in message or "resource" not in message:
+                        self.send(writer, {"id": message.get("id"), "error": f"{op} needs process and resource"})
+                        continue
+                    self.events.put_nowait(((op, message["process"], message["resource"]), message.get("id"), writer))
+                elif op == "snapshot":
+                    task = asyncio.create_task(self.analyze_snapshot(writer, message))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                elif op == "status":
+                    self.events.put_nowait((None, message.get("id"), writer))
+                elif op == "subscribe":
+                    self.subscribers.add(writer)
+                else:
+                    self.send(writer, {"id": message.get("id"), "error": f"unknown op {op!r}"})
+                await writer.drain()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.discard(writer)
+            writer.close()
+
+
+async def serve(args):
+    service = DetectionService(args.jobs, args.batch_size)
+    applier = await service.start()
+    if args.unix:
+        server = await asyncio.start_unix_server(service.handle_client, args.unix, limit=MAX_LINE, backlog=4096)
+        where = args.unix
+    else:
+        server = await asyncio.start_server(service.handle_client, args.host, args.port, limit=MAX_LINE, backlog=4096)
+        where = f"{args.host}:{args.port}"
+    print(f"deadlock service listening on {where}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        applier.cancel()
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve deadlock detection over a local socket (JSON Lines).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7878)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="processes for snapshot analysis")
+    parser.add_argument("--batch-size", type=int, default=4096, help="most events applied per detector batch")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+# Binary snapshot format for large scenarios. The matrices are stored as raw int32
+# arrays behind a small JSON header, so load_snapshot() can memory-map them without
+# copying and analysis only pages in the parts it touches.
+#
+# Layout (all sections 64-byte aligned, little-endian):
+#   MAGIC (8 bytes) | header length (uint64) | header JSON
+#   available[m] | max[n, m] | allocated[n, m] | requested[n, m]
+#
+#   python deadlock_snapshot.py convert scenario.csv scenario.dlsnap
+#   python deadlock_snapshot.py info scenario.dlsnap
+import json
+import struct
+import sys
+
+from deadlock_core import Scenario
+
+MAGIC = b"DLSNAP\x00\x01"
+ALIGN = 64
+DTYPE = "<i4"
+SECTIONS = ("available", "max", "allocated", "requested")
+
+
+def _align(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def _layout(processes, resources):
+    n, m = len(processes), len(resources)
+    header = {"n": n, "m": m, "dtype": DTYPE, "processes": processes, "resources": resources, "offsets": {}}
+    # Offsets depend on the header size, which depends on the offsets; repeat until stable
+    while True:
+        blob = json.dumps(header).encode()
+        offset = _align(len(MAGIC) + 8 + len(blob))
+        offsets = {}
+        for name in SECTIONS:
+            offsets[name] = offset
+            offset = _align(offset + 4 * (m if name == "available" else n * m))
+        if offsets == header["offsets"]:
+            return header, blob, offset
+        header["offsets"] = offsets
+
+
+def _create(path, processes, resources):
+    # Writes the header and sizes the file; returns writable memmaps for each section
+    header, blob, size = _layout(list(processes), list(resources))
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(blob)) + blob)
+        f.truncate(size)
+    return _sections(path, header, "r+")
+
+
+def _sections(path, header, mode):
+    import numpy as np
+    n, m = header["n"], header["m"]
+    return {name: np.memmap(path, dtype=header["dtype"], mode=mode, offset=header["offsets"][name],
+                            shape=(m,) if name == "available" else (n, m))
+            for name in SECTIONS}
+
+
+def is_snapshot(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a deadlock snapshot")
+        (length,) = struct.unpack("<Q", f.read(8))
+        return json.loads(f.read(length))
+
+
+def save_snapshot(scenario, path):
+    arrays = _create(path, scenario.processes, scenario.resources)
+    arrays["available"][:] = scenario.available
+    arrays["max"][:] = scenario.max_demand
+    arrays["allocated"][:] = scenario.allocated
+    arrays["requested"][:] = scenario.requested
+    for array in arrays.values():
+        array.flush()
+
+
+def load_snapshot(path):
+    # Scenario whose matrices are read-only views of the file; nothing is copied
+    header = read_header(path)
+    arrays = _sections(path, header, "r")
+    return Scenario(header["processes"], header["resources"], arrays["available"], arrays["max"],
+                    arrays["allocated"], arrays["requested"])
+
+
+def _rows(path):
+    # Non-blank, non-comment lines split on commas or whitespace
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line_no, line.replace(",", " ").split()
+
+
+def convert_text(src, dst):
+    # Text/CSV form, comma- or whitespace-separated:
+    #   resources Printer Disk Tape
+    #   available 1 1 0
+    #   P0 <m max values> <m allocated values> <m requested values>
+    # Two streaming passes, so memory stays O(m) whatever the number of processes.
+    import numpy as np
+    rows = _rows(src)
+    _, first = next(rows)
+    _, second = next(rows)
+    if first[0] != "resources" or second[0] != "available":
+        raise ValueError("expected 'resources' and 'available' rows first")
+    resources = first[1:]
+    m = len(resources)
+    processes = [fields[0] for _, fields in rows]
+
+    arrays = _create(dst, processes, resources)
+    arrays["available"][:] = np.array(second[1:], dtype=np.int64)
+    rows = _rows(src)
+    next(rows)
+    next(rows)
+    for i, (line_no, fields) in enumerate(rows):
+        if len(fields) != 3 * m + 1:
+            raise ValueError(f"line {line_no}: expected {3 * m} values for {fields[0]}, got {len(fields) - 1}")
+        values = np.array(fields[1:], dtype=np.int64)
+        arrays["max"][i] = values[:m]
+        arrays["allocated"][i] = values[m:2 * m]
+        arrays["requested"][i] = values[2 * m:]
+    for array in arrays.values():
+        array.flush()
+
+
+def validate_matrices(processes, resources, available, max_demand, allocated, requested, total=None):
+    # Every problem as (process row, or None for a per-resource one, message), found with
+    # whole-matrix comparisons rather than a loop over processes
+    import numpy as np
+    errors = []
+    negative = (max_demand < 0).any(axis=1) | (allocated < 0).any(axis=1) | (requested < 0).any(axis=1)
+    for i in np.flatnonzero(negative):
+        errors.append((int(i), f"{processes[i]}: values must be non-negative"))
+    over = allocated > max_demand
+    for i in np.flatnonzero(over.any(axis=1)):
+        names = ", ".join(resources[j] for j in np.flatnonzero(over[i]))
+        errors.append((int(i), f"{processes[i]}: allocated exceeds max for {names}"))
+    for j in np.flatnonzero(available < 0):
+        errors.append((None, f"{resources[j]}: available is negative ({available[j]})"))
+    if total is not None:
+        held = allocated.sum(axis=0)
+        for j in np.flatnonzero(held + available != total):
+            errors.append((None, f"{resources[j]}: {held[j]} allocated + {available[j]} available != total {total[j]}"))
+    seen = {}
+    for i, p in enumerate(processes):
+        if seen.setdefault(p, i) != i:
+            errors.append((i, f"{p}: duplicate process name"))
+    return errors
+
+
+def parse_text(lines):
+    # One pass over the text/CSV form of convert_text (pasted text or an open file). A
+    # "total" row may replace or accompany "available"; available is then what is left
+    # after the allocations. Returns (scenario, errors); errors are (line number, message)
+    # pairs, and scenario is None whenever there are any.
+    import numpy as np
+    header, body, line_nos, errors = {}, [], [], []
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fields = line.replace(",", " ").split()
+        if fields[0] in ("resources", "available", "total") and not body:
+            header[fields[0]] = (line_no, fields[1:])
+        else:
+            body.append(fields)
+            line_nos.append(line_no)
+    if "resources" not in header:
+        return None, [(1, "expected a 'resources' row first")]
+    resources = header["resources"][1]
+    m = len(resources)
+
+    vectors = {}
+    for key in ("available", "total"):
+        if key in header:
+            line_no, values = header[key]
+            try:
+                if len(values) != m:
+                    raise ValueError
+                vectors[key] = np.array(values, dtype=np.int64)
+            except ValueError:
+                errors.append((line_no, f"expected {m} integer {key} values"))
+    if "available" not in header and "total" not in header:
+        errors.append((header["resources"][0], "expected an 'available' or 'total' row"))
+
+    rows = [k for k, fields in enumerate(body) if len(fields) == 3 * m + 1]
+    for k in sorted(set(range(len(body))) - set(rows)):
+        errors.append((line_nos[k], f"{body[k][0]}: expected {3 * m} values (max, allocated, requested), got {len(body[k]) - 1}"))
+    try:
+        block = np.array([body[k][1:] for k in rows], dtype=np.int64).reshape(len(rows), 3 * m)
+    except ValueError:
+        # Rare path: find the rows that do not parse, keep the rest
+        good = []
+        for k in rows:
+            try:
+                [int(x) for x in body[k][1:]]
+                good.append(k)
+            except ValueError:
+                errors.append((line_nos[k], f"{body[k][0]}: values must be integers"))
+        rows = good
+        block = np.array([body[k][1:] for k in rows], dtype=np.int64).reshape(len(rows), 3 * m)
+
+    processes = [body[k][0] for k in rows]
+    max_demand, allocated, requested = block[:, :m], block[:, m:2 * m], block[:, 2 * m:]
+    total = vectors.get("total")
+    available = vectors.get("available")
+    if available is None and total is not None:
+        available = total - allocated.sum(axis=0)
+    if available is not None:
+        vector_line = header["available" if "available" in header else "total"][0]
+        for row, message in validate_matrices(processes, resources, available, max_demand, allocated, requested, total):
+            errors.append((vector_line if row is None else line_nos[rows[row]], message))
+    if errors:
+        return None, sorted(errors, key=lambda e: e[0])
+    return Scenario(processes, resources, available, max_demand, allocated, requested), []
+
+
+def convert(src, dst):
+    if src.endswith(".json"):
+        with open(src) as f:
+            save_snapshot(Scenario.from_dict(json.load(f)), dst)
+    else:
+        convert_text(src, dst)
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) == 3 and args[0] == "convert":
+        convert(args[1], args[2])
+        return 0
+    if len(args) == 2 and args[0] == "info":
+        header = read_header(args[1])
+        print(f"{header['n']} processes x {header['m']} resources, dtype {header['dtype']}")
+        return 0
+    print("usage: python deadlock_snapshot.py convert SRC(.json|.csv|.txt) DST.dlsnap\n"
+          "       python deadlock_snapshot.py info FILE.dlsnap", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
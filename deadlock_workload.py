@@ -0,0 +1,100 @@
+# Synthetic scenarios for benchmarks and stress tests: random holdings and requests at a
+# chosen size, density and instance count, with a known number of injected deadlocks.
+#
+#   python deadlock_workload.py 1000 50 --density 0.05 --instances 1 3 --deadlocks 2 -o big.json
+#   python deadlock_workload.py 100000 200 -o big.dlsnap
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from deadlock_core import Scenario, detect_deadlock_matrix
+
+
+def generate_scenario(processes, resources, density=0.05, instances=(1, 1), deadlocks=0,
+                      cycle_length=(2, 4), seed=None):
+    # density: chance that a process holds (and, separately, requests) a given resource type.
+    # instances: (low, high) units per resource type. The random part is made deadlock-free
+    # first, then `deadlocks` cycles are injected over disjoint processes and resource types.
+    rng = np.random.default_rng(seed)
+    n, m = processes, resources
+    low, high = instances
+    totals = rng.integers(low, high + 1, m)
+
+    holds = rng.random((n, m)) < density
+    allocated = np.zeros((n, m), dtype=np.int64)
+    for j in range(m):
+        holders = np.flatnonzero(holds[:, j])
+        if holders.size:
+            units = rng.integers(0, totals[j] + 1)
+            allocated[holders, j] = rng.multinomial(units, np.full(holders.size, 1 / holders.size))
+
+    wants = (rng.random((n, m)) < density) & (allocated == 0)
+    requested = np.where(wants, np.minimum(rng.integers(1, high + 1, (n, m)), totals), 0)
+    # Processes the random requests leave stuck stop asking, so only injected cycles deadlock
+    stuck = detect_deadlock_matrix(allocated, requested, totals - allocated.sum(axis=0))
+    requested[stuck] = 0
+
+    lo, hi = cycle_length
+    free = rng.permutation(n).tolist()
+    free_kinds = rng.permutation(m).tolist()
+    injected = []
+    for _ in range(deadlocks):
+        length = int(rng.integers(lo, hi + 1))
+        if length > min(len(free), len(free_kinds)):
+            raise ValueError(f"not enough processes/resource types left to inject {deadlocks} cycles")
+        cycle = [free.pop() for _ in range(length)]
+        injected += cycle
+        kinds = [free_kinds.pop() for _ in range(length)]
+        requested[cycle] = 0
+        for i, p in enumerate(cycle):
+            # cycle[i] holds a unit of kinds[i]; cycle[i - 1] wants every unit it does not hold
+            j = kinds[i]
+            if allocated[:, j].sum() >= totals[j]:
+                donor = rng.choice(np.flatnonzero(allocated[:, j]))
+                allocated[donor, j] -= 1
+            allocated[p, j] += 1
+        for i, p in enumerate(cycle):
+            j = kinds[(i + 1) % length]
+            requested[p, j] = totals[j] - allocated[p, j]
+
+    # The cycles hold units that random requests may be waiting for, and donors gave some
+    # up: processes stuck only behind a cycle stop asking too, so it stays the deadlock
+    if injected:
+        stuck = detect_deadlock_matrix(allocated, requested, totals - allocated.sum(axis=0))
+        requested[np.setdiff1d(stuck, injected)] = 0
+
+    available = totals - allocated.sum(axis=0)
+    extra = rng.integers(0, high + 1, (n, m)) * (rng.random((n, m)) < density)
+    max_demand = np.minimum(allocated + requested + extra, totals)
+    return Scenario([f"P{i}" for i in range(n)], [f"R{j}" for j in range(m)],
+                    available, max_demand, allocated, requested)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic deadlock scenario.")
+    parser.add_argument("processes", type=int)
+    parser.add_argument("resources", type=int)
+    parser.add_argument("--density", type=float, default=0.05, help="chance a process holds/requests a given resource type")
+    parser.add_argument("--instances", type=int, nargs=2, default=(1, 1), metavar=("LOW", "HIGH"), help="units per resource type")
+    parser.add_argument("--deadlocks", type=int, default=0, help="cycles to inject")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("-o", "--output", help=".json or .dlsnap file (default: JSON on stdout)")
+    args = parser.parse_args(argv)
+
+    scenario = generate_scenario(args.processes, args.resources, args.density, tuple(args.instances),
+                                 args.deadlocks, seed=args.seed)
+    if args.output and args.output.endswith(".dlsnap"):
+        from deadlock_snapshot import save_snapshot
+        save_snapshot(scenario, args.output)
+    elif args.output:
+        with open(args.output, "w") as f:
+            json.dump(scenario.to_dict(), f)
+    else:
+        json.dump(scenario.to_dict(), sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+# The vectorized Banker's check must return the same safe sequence as the reference
+# dict implementation, not just agree on safe/unsafe.
+#
+#   python -m pytest -q test_deadlock_bankers.py
+import numpy as np
+import pytest
+
+from deadlock_core import bankers_safe_dicts, bankers_safe_matrix
+
+
+def reference(max_demand, allocated, available):
+    processes = [f"P{i}" for i in range(len(max_demand))]
+    resources = [f"R{j}" for j in range(len(available))]
+    order = bankers_safe_dicts(processes, resources, dict(zip(resources, available.tolist())),
+                               {p: dict(zip(resources, row)) for p, row in zip(processes, max_demand.tolist())},
+                               {p: dict(zip(resources, row)) for p, row in zip(processes, allocated.tolist())})
+    return None if order is None else [processes.index(p) for p in order]
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_same_sequence_as_dict_implementation(seed):
+    rng = np.random.default_rng(seed)
+    n, m = int(rng.integers(1, 40)), int(rng.integers(1, 6))
+    allocated = rng.integers(0, 3, (n, m))
+    max_demand = allocated + rng.integers(0, 4, (n, m))
+    # From plenty of slack to none, so both safe and unsafe states come up
+    available = rng.integers(0, 1 + int(rng.integers(1, 8)), m)
+    order = bankers_safe_matrix(max_demand, allocated, available)
+    expected = reference(max_demand, allocated, available)
+    assert (None if order is None else [int(i) for i in order]) == expected
+
+
+def test_empty_and_trivial_states():
+    assert bankers_safe_matrix(np.zeros((0, 2), int), np.zeros((0, 2), int), np.array([1, 1])) is not None
+    assert list(bankers_safe_matrix(np.array([[2]]), np.array([[1]]), np.array([1]))) == [0]
+    assert bankers_safe_matrix(np.array([[3]]), np.array([[1]]), np.array([1])) is None
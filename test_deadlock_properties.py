@@ -0,0 +1,118 @@
+# Property checks of the fast paths against brute force on small random inputs.
+#
+#   python -m pytest -q test_deadlock_properties.py
+import itertools
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from deadlock_core import (DENY, GRANT, WAIT, BankersAdmission, IncrementalDeadlockDetector, Scenario,
+                           bankers_safe_matrix, find_deadlock, min_cost_victims)
+from deadlock_partition import Coordinator, hash_owner, partition_graph
+
+SEEDS = range(40)
+
+
+def on_cycle(graph, n):
+    # Brute force: n lies on a cycle iff it can reach itself
+    return any(nx.has_path(graph, s, n) for s in graph.successors(n))
+
+
+def is_cycle(graph, cycle):
+    return len(cycle) > 1 and all(graph.has_edge(a, b) for a, b in zip(cycle, cycle[1:] + cycle[:1]))
+
+
+def random_rag(rng, processes, resources, density):
+    rag = nx.DiGraph()
+    rag.add_nodes_from((f"P{i}" for i in range(processes)), kind="process")
+    rag.add_nodes_from((f"R{j}" for j in range(resources)), kind="resource")
+    for i in range(processes):
+        for j in range(resources):
+            if rng.random() < density:
+                rag.add_edge(f"P{i}", f"R{j}")
+            elif rng.random() < density:
+                rag.add_edge(f"R{j}", f"P{i}")
+    return rag
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_incremental_detector_matches_recomputation(seed):
+    rng = random.Random(seed)
+    detector = IncrementalDeadlockDetector()
+    processes = [f"P{i}" for i in range(6)]
+    resources = [f"R{j}" for j in range(5)]
+    for _ in range(60):
+        op = rng.choice(["request", "request", "allocate", "release"])
+        p, r = rng.choice(processes), rng.choice(resources)
+        cycle = getattr(detector, op)(p, r)
+        rag = detector.rag
+        if cycle:
+            assert is_cycle(rag, cycle)
+        expected = sorted(n for n in rag if rag.nodes[n]["kind"] == "process" and on_cycle(rag, n))
+        assert sorted(detector.deadlocked_processes()) == expected
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_min_cost_victims_is_optimal(seed):
+    rng = random.Random(seed)
+    rag = random_rag(rng, 7, 5, 0.3)
+    resources = {n for n in rag if rag.nodes[n]["kind"] == "resource"}
+    processes = sorted(set(rag) - resources)
+    costs = {p: rng.randint(1, 5) for p in processes}
+    victims, total = min_cost_victims(rag, resources, costs)
+
+    rest = rag.copy()
+    rest.remove_nodes_from(victims)
+    assert nx.is_directed_acyclic_graph(rest)
+    assert total == sum(costs[v] for v in victims)
+    best = min(sum(costs[v] for v in subset)
+               for k in range(len(processes) + 1) for subset in itertools.combinations(processes, k)
+               if nx.is_directed_acyclic_graph(rag.subgraph(set(rag) - set(subset))))
+    assert total == best
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_bankers_admission_matches_full_safety_check(seed):
+    rng = np.random.default_rng(seed)
+    n, m = 5, 3
+    max_demand = rng.integers(0, 4, (n, m))
+    allocated = np.zeros((n, m), dtype=np.int64)
+    available = max_demand.max(axis=0) + rng.integers(0, 2, m)
+    admission = BankersAdmission(Scenario([f"P{i}" for i in range(n)], [f"R{j}" for j in range(m)],
+                                          available, max_demand, allocated, np.zeros((n, m), dtype=np.int64)))
+    totals = admission.available + admission.allocated.sum(axis=0)
+    for _ in range(80):
+        p = int(rng.integers(n))
+        if rng.random() < 0.7:
+            vector = rng.integers(0, admission.need[p] + 2)  # sometimes over the claim
+            need, avail, alloc = admission.need[p].copy(), admission.available.copy(), admission.allocated.copy()
+            waiting = len(admission.waiting)
+            verdict = admission.request(p, vector)
+            if (vector > need).any():
+                assert verdict == DENY
+            else:
+                # Granted iff the units are free and the state after granting is safe
+                alloc[p] += vector
+                fits = (vector <= avail).all() and bankers_safe_matrix(max_demand, alloc, avail - vector) is not None
+                assert verdict == (GRANT if fits else WAIT)
+                assert len(admission.waiting) == waiting + (verdict == WAIT)
+        elif admission.allocated[p].any():
+            admission.release(p, rng.integers(0, admission.allocated[p] + 1))
+        assert (admission.available + admission.allocated.sum(axis=0) == totals).all()
+        assert bankers_safe_matrix(admission.max_demand, admission.allocated, admission.available) is not None
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_partition_coordinator_matches_find_deadlock(seed):
+    rng = random.Random(seed)
+    rag = random_rag(rng, 12, 8, 0.15)
+    resources = {n for n in rag if rag.nodes[n]["kind"] == "resource"}
+    owner = hash_owner(1 + seed % 4)
+    with Coordinator(partition_graph(rag, owner), owner, inline=True) as coordinator:
+        result = coordinator.detect()
+    expected, _ = find_deadlock(rag, resources)
+    assert sorted(result["deadlocked"]) == sorted(expected)
+    for cycle in result["cycles"]:
+        assert is_cycle(rag, cycle)
@@ -0,0 +1,35 @@
+# What-if recovery scoring: terminations and preemptions are costed on one scale.
+#
+#   python -m pytest -q test_deadlock_recovery.py
+import numpy as np
+
+from deadlock_core import Scenario
+from deadlock_recovery import explore_recoveries, score
+
+
+def knot():
+    # P0 and P1 each hold one unit of R0/R1 and two of R2, and wait for the other's
+    allocated = np.array([[1, 0, 2], [0, 1, 2]])
+    requested = np.array([[0, 1, 0], [1, 0, 0]])
+    return Scenario(["P0", "P1"], ["R0", "R1", "R2"], [0, 0, 0], allocated + requested, allocated, requested)
+
+
+def test_default_costs_are_units_held():
+    s = knot()
+    assert score(s, ("terminate", ("P0",), None))["cost"] == 3
+    assert score(s, ("preempt", ("P0",), "R0"))["cost"] == 1
+
+
+def test_preemption_costs_a_share_of_the_victims_cost():
+    s = knot()
+    costs = {"P0": 100, "P1": 90}
+    assert score(s, ("terminate", ("P0",), None), costs)["cost"] == 100
+    assert score(s, ("preempt", ("P0",), "R0"), costs)["cost"] == 100 / 3
+    assert score(s, ("preempt", ("P1",), "R2"), costs)["cost"] == 60
+
+
+def test_ranking_uses_the_callers_costs_for_both_actions():
+    ranked = explore_recoveries(knot(), costs={"P0": 300, "P1": 3}, jobs=1)
+    best = ranked[0]
+    assert best["deadlock_free"] and best["victims"] == ["P1"]
+    assert all(c["cost"] >= best["cost"] for c in ranked if c["deadlock_free"] and c["safe"] == best["safe"])
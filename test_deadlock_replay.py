@@ -0,0 +1,81 @@
+# Event-log replay: checkpointed seeks against a straight replay, multi-unit resources
+# and malformed events.
+#
+#   python -m pytest -q test_deadlock_replay.py
+import random
+
+import pytest
+
+from deadlock_replay import Replay, ReplayState, parse_event
+
+
+def write_log(tmp_path, lines):
+    path = tmp_path / "events.log"
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def snapshot(state):
+    return (sorted(state.detector.rag.edges), sorted(state.held.items()), sorted(state.deadlocked_processes()),
+            state.unsafe)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_state_at_matches_linear_replay(tmp_path, seed):
+    rng = random.Random(seed)
+    lines = ["# header", "0 resource - R0 2", "0 resource - R1 1", "0 resource - R2 3"]
+    lines += [f"0 claim P{i} R{j} {rng.randint(1, 2)}" for i in range(4) for j in range(3)]
+    for t in range(1, 300):
+        op = rng.choice(["request", "allocate", "allocate", "release"])
+        lines.append(f"{t} {op} P{rng.randrange(4)} R{rng.randrange(3)}")
+        if rng.random() < 0.05:
+            lines.append("")
+    replay = Replay(write_log(tmp_path, lines), checkpoint_every=37)
+    replay.run()
+
+    state = ReplayState()
+    expected = [snapshot(state)]
+    for index, _, event in replay.events():
+        state.apply(index, event)
+        expected.append(snapshot(state))
+    assert replay.length == len(expected) - 1
+    for at in rng.sample(range(len(expected)), 40) + [0, replay.length]:
+        assert snapshot(replay.state_at(at)) == expected[at]
+
+
+def test_multi_unit_cycle_with_free_units_is_not_a_deadlock(tmp_path):
+    replay = Replay(write_log(tmp_path, ["0 resource - R1 2", "0 resource - R2 2",
+                                         "1 allocate P1 R1", "2 allocate P2 R2",
+                                         "3 request P1 R2", "4 request P2 R1"]))
+    assert replay.run() == []
+    assert replay.state_at(6).deadlocked_processes() == []
+
+
+def test_multi_unit_deadlock_is_reported_once_units_run_out(tmp_path):
+    replay = Replay(write_log(tmp_path, ["0 resource - R1 2", "0 resource - R2 2",
+                                         "1 allocate P1 R1", "2 allocate P2 R2",
+                                         "3 request P1 R2 2", "4 request P2 R1 2",
+                                         "5 release P1 R1"]))
+    incidents = replay.run()
+    assert [(i["index"], i["kind"]) for i in incidents] == [(5, "deadlock")]
+    assert set(incidents[0]["cycle"]) == {"P1", "R2", "P2", "R1"}
+    assert replay.state_at(6).deadlocked_processes() == ["P1", "P2"]
+    assert replay.state_at(7).deadlocked_processes() == []
+
+
+def test_single_instance_cycle_is_a_deadlock(tmp_path):
+    replay = Replay(write_log(tmp_path, ["1 allocate P1 R1", "2 allocate P2 R2", "3 request P1 R2", "4 request P2 R1"]))
+    assert [i["index"] for i in replay.run()] == [3]
+
+
+@pytest.mark.parametrize("line", [b'{"t": 1, "op": "request", "process": "P1"}', b'{"t": 1, "process": "P1"}',
+                                  b"0 resource - R1", b"0 claim P1 R1", b"1 grab P1 R1"])
+def test_malformed_events_are_rejected(line):
+    with pytest.raises(ValueError):
+        parse_event(line)
+
+
+def test_errors_name_the_line(tmp_path):
+    replay = Replay(write_log(tmp_path, ["1 allocate P1 R1", "", '{"op": "release", "process": "P1"}']))
+    with pytest.raises(ValueError, match="line 3"):
+        replay.run()
@@ -0,0 +1,74 @@
+# Bulk matrix input: the vectorized validation against a per-cell loop, and the line
+# numbers parse_text reports.
+#
+#   python -m pytest -q test_deadlock_snapshot.py
+import numpy as np
+import pytest
+
+from deadlock_snapshot import parse_text, validate_matrices
+
+
+def loop_errors(processes, resources, available, max_demand, allocated, requested, total=None):
+    # Reference: the same checks one cell at a time, as (row or None, message) pairs
+    errors = set()
+    for i, p in enumerate(processes):
+        if any(v < 0 for matrix in (max_demand, allocated, requested) for v in matrix[i]):
+            errors.add((i, f"{p}: values must be non-negative"))
+        over = [r for j, r in enumerate(resources) if allocated[i][j] > max_demand[i][j]]
+        if over:
+            errors.add((i, f"{p}: allocated exceeds max for {', '.join(over)}"))
+        if p in processes[:i]:
+            errors.add((i, f"{p}: duplicate process name"))
+    for j, r in enumerate(resources):
+        if available[j] < 0:
+            errors.add((None, f"{r}: available is negative ({available[j]})"))
+        held = sum(row[j] for row in allocated)
+        if total is not None and held + available[j] != total[j]:
+            errors.add((None, f"{r}: {held} allocated + {available[j]} available != total {total[j]}"))
+    return errors
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_validation_matches_cell_by_cell_checks(seed):
+    rng = np.random.default_rng(seed)
+    n, m = int(rng.integers(1, 15)), int(rng.integers(1, 5))
+    processes = [f"P{i}" for i in rng.integers(0, n + 3, n)]  # some duplicates
+    resources = [f"R{j}" for j in range(m)]
+    max_demand, allocated, requested = (rng.integers(-1, 4, (n, m)) for _ in range(3))
+    available = rng.integers(-1, 3, m)
+    total = allocated.sum(axis=0) + available + rng.integers(0, 2, m) if seed % 2 else None
+    errors = validate_matrices(processes, resources, available, max_demand, allocated, requested, total)
+    assert len(errors) == len(set(errors))
+    assert set(errors) == loop_errors(processes, resources, available.tolist(), max_demand.tolist(),
+                                      allocated.tolist(), requested.tolist(), None if total is None else total.tolist())
+
+
+def test_valid_text_parses():
+    scenario, errors = parse_text(["# two processes", "resources A, B", "total 2 1", "",
+                                   "P1 1 1 1 0 0 1", "P2 1 0 1 0 0 0"])
+    assert errors == []
+    assert scenario.processes == ["P1", "P2"]
+    assert scenario.available.tolist() == [0, 1]
+    assert scenario.requested.tolist() == [[0, 1], [0, 0]]
+
+
+def test_errors_name_their_lines():
+    scenario, errors = parse_text(["resources A B", "available 1 -1",
+                                   "P1 1 1 0 0 0 0",          # 3: valid
+                                   "P2 1 1 2 0 0 0",          # 4: allocated exceeds max
+                                   "P3 1 1 0 0",              # 5: too few values
+                                   "P4 1 x 0 0 0 0",          # 6: not an integer
+                                   "P1 0 0 0 0 0 0"])         # 7: duplicate
+    assert scenario is None
+    assert [line for line, _ in errors] == [2, 4, 5, 6, 7]
+    assert "available is negative" in errors[0][1]
+    assert "allocated exceeds max for A" in errors[1][1]
+    assert "expected 6 values" in errors[2][1]
+    assert "integers" in errors[3][1]
+    assert "duplicate" in errors[4][1]
+
+
+def test_missing_header_rows():
+    assert parse_text(["P1 1 0 0"]) == (None, [(1, "expected a 'resources' row first")])
+    scenario, errors = parse_text(["resources A", "P1 1 0 0"])
+    assert scenario is None and errors == [(1, "expected an 'available' or 'total' row")]
@@ -0,0 +1,48 @@
+# The compressed wait-for graph must find what the RAG finds on single-instance systems.
+#
+#   python -m pytest -q test_deadlock_wait_for.py
+import numpy as np
+import pytest
+
+from deadlock_core import Scenario, build_rag, find_scenario_deadlock, min_cost_victims
+from deadlock_workload import generate_scenario
+
+
+def random_single_instance(seed, n=12, m=10, density=0.2):
+    # Each resource held by at most one process, requests on anything else
+    rng = np.random.default_rng(seed)
+    allocated = np.zeros((n, m), dtype=np.int64)
+    owners = rng.integers(-1, n, m)
+    for j, i in enumerate(owners):
+        if i >= 0:
+            allocated[i, j] = 1
+    requested = ((rng.random((n, m)) < density) & (allocated == 0)).astype(np.int64)
+    available = 1 - allocated.sum(axis=0)
+    return Scenario([f"P{i}" for i in range(n)], [f"R{j}" for j in range(m)], available,
+                    allocated + requested, allocated, requested)
+
+
+def scenarios():
+    for seed in range(60):
+        yield random_single_instance(seed)
+    for seed in range(20):
+        yield generate_scenario(400, 80, 0.01, (1, 1), deadlocks=1 + seed % 4, seed=seed)
+
+
+@pytest.mark.parametrize("scenario", list(scenarios()))
+def test_same_deadlock_as_the_rag(scenario):
+    rag = build_rag(scenario)
+    expected, _ = find_scenario_deadlock(scenario)
+    deadlocked, cycles = find_scenario_deadlock(scenario, compress=True)
+    assert deadlocked == expected
+    assert len(cycles) == len(scenario.wait_for().components())
+    for cycle in cycles:
+        assert all(rag.has_edge(a, b) for a, b in zip(cycle, cycle[1:] + cycle[:1]))
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_same_victim_cost_as_the_rag(seed):
+    scenario = random_single_instance(seed)
+    _, total = scenario.wait_for().min_cost_victims()
+    _, expected = min_cost_victims(build_rag(scenario), scenario.resource_index)
+    assert total == expected